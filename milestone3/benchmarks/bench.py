@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+# The simulator modules live one directory up
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from config import SimConfig
+from profiling import RunProfile
+from simulator import Simulator
+from tracegen import TraceShape, write_trace
+
+# --- BENCHMARKS ---
+# python benchmarks/bench.py -o baseline.json            measure (e.g. on the reference commit)
+# python benchmarks/bench.py --baseline baseline.json    exit status 1 on a regression
+# Synthetic traces are generated into TRACE_DIR on first use and reused.
+TRACE_DIR = os.path.join(BENCH_DIR, "traces")
+INSTRUCTIONS = 200_000 # per synthetic trace at --scale 1
+
+# Regressions that fail a comparison: throughput lower / peak memory higher by more than this
+THROUGHPUT_THRESHOLD = 0.15
+MEMORY_THRESHOLD = 0.25
+
+BASE = dict(cache_size=64, block_size=16, associativity=4, replacement_policy="RR",
+            physical_memory=1024, utilization=0, instructions=-1, seed=1)
+
+# name -> ((trace shape, seed) per process, SimConfig changes). Each case stresses one hot path.
+CASES = {
+    "baseline": ([(TraceShape(), 1)], {}),
+    # 8 MB cache: 131072 tag slots, full-width set scans on every access
+    "huge-cache": ([(TraceShape(), 1)], dict(cache_size=8192, block_size=64, associativity=16)),
+    # 8-byte blocks: most instruction fetches span several blocks
+    "tiny-blocks": ([(TraceShape(), 1)], dict(block_size=8, associativity=2)),
+    # 327 user pages for 2048 data pages: a page fault (and invalidation) every few accesses
+    "page-faults": ([(TraceShape(data_pages=2048, working_set_pages=256), 1)], dict(physical_memory=128, utilization=99)),
+    # 327 user pages, a 128 page working set that moves every 10000 instructions: page-fault storms
+    "fault-storms": ([(TraceShape(data_pages=4096, working_set_pages=128, hot_rate=1, phase_length=10_000), 1)],
+                     dict(physical_memory=128, utilization=99)),
+    # 3 processes interleaved every 100 instructions, sharing the user pages
+    "three-processes": ([(TraceShape(), 1), (TraceShape(), 2), (TraceShape(), 3)], dict(instructions=100, physical_memory=128, utilization=95)),
+}
+
+RESULT_FIELDS = ("hit_rate", "cpi", "page_faults")
+
+
+def cached_trace(shape, instructions, seed):
+    """
+    Path of the synthetic trace for these arguments in TRACE_DIR, generated
+    first if it is not there yet (traces are deterministic, so reusing one is safe).
+    """
+    parts = [f"synth_i{instructions}_s{seed}"]
+    for key, value in sorted(shape.changes().items()):
+        parts.append(key + ("-".join(map(str, value)) if isinstance(value, tuple) else str(value)))
+    path = os.path.join(TRACE_DIR, "_".join(parts) + ".trc")
+    if not os.path.exists(path):
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        write_trace(tmp_path, shape, instructions, seed, compiled=False)
+        os.replace(tmp_path, path)
+    return path
+
+
+def run_case(name, scale, engine):
+    """
+    Runs one case in this process and returns its measurements.
+    """
+    traces, changes = CASES[name]
+    instructions = int(INSTRUCTIONS * scale)
+    trace_files = [cached_trace(shape, instructions, seed) for shape, seed in traces]
+
+    profile = RunProfile()
+    simulator = Simulator(SimConfig(**{**BASE, **changes}), engine=engine, profile=profile)
+    with profile.running():
+        results = simulator.run(trace_files)
+
+    return {
+        "seconds": round(profile.wall_seconds, 4),
+        "instructions": profile.instructions,
+        "accesses": profile.accesses,
+        "instructions_per_second": round(profile.instructions_per_second),
+        "accesses_per_second": round(profile.accesses_per_second),
+        "peak_rss_mb": round(profile.peak_rss / 2**20, 1),
+        "hit_rate": round(results.hit_rate, 4),
+        "cpi": round(results.cpi, 4),
+        "page_faults": results.total_page_faults,
+    }
+
+
+def measure(name, scale, engine, repeat):
+    """
+    Best of 'repeat' runs of a case, each in a fresh interpreter so the peak memory is its own.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-case", name,
+                                 "--scale", str(scale), "--engine", engine],
+                                check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output))
+    best = min(runs, key=lambda run: run["seconds"])
+    best["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+    return best
+
+
+def compare(results, baseline, throughput_threshold, memory_threshold):
+    """
+    Returns the regressions of results against baseline, as messages.
+    """
+    problems = []
+    for name, current in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            continue
+        if current["accesses_per_second"] < before["accesses_per_second"] * (1 - throughput_threshold):
+            problems.append(f"{name}: throughput {current['accesses_per_second']:,} accesses/s, "
+                            f"baseline {before['accesses_per_second']:,}")
+        if current["peak_rss_mb"] > before["peak_rss_mb"] * (1 + memory_threshold):
+            problems.append(f"{name}: peak memory {current['peak_rss_mb']} MB, baseline {before['peak_rss_mb']} MB")
+        changed = [field for field in RESULT_FIELDS if current[field] != before[field]]
+        if changed and results["scale"] == baseline["scale"]:
+            problems.append(f"{name}: simulation results changed ({', '.join(changed)})")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulator benchmarks on synthetic traces')
+    parser.add_argument('--cases', type=str, help=f'Comma-separated cases (default: all of {", ".join(CASES)})', dest='cases')
+    parser.add_argument('--scale', type=float, help=f'Trace length factor ({INSTRUCTIONS} instructions per trace at 1)', dest='scale', default=1.0)
+    parser.add_argument('--repeat', type=int, help='Runs per case, the fastest counts', dest='repeat', default=3)
+    parser.add_argument('--engine', type=str, help='Simulation engine', dest='engine', default='python')
+    parser.add_argument('-o', '--output', type=str, help='Write the measurements to this JSON file', dest='output')
+    parser.add_argument('--baseline', type=str, help='Fail on regressions against this earlier --output file', dest='baseline')
+    parser.add_argument('--threshold', type=float, help='Allowed throughput drop (fraction)', dest='threshold', default=THROUGHPUT_THRESHOLD)
+    parser.add_argument('--memory-threshold', type=float, help='Allowed peak memory growth (fraction)', dest='memory_threshold', default=MEMORY_THRESHOLD)
+    parser.add_argument('--run-case', type=str, help=argparse.SUPPRESS, dest='run_case')
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.scale, args.engine)))
+        return
+
+    names = args.cases.split(',') if args.cases else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        print(f'Error: unknown case(s) {", ".join(unknown)}. Cases: {", ".join(CASES)}')
+        sys.exit(2)
+
+    results = {"python": platform.python_version(), "machine": platform.machine(),
+               "engine": args.engine, "scale": args.scale, "cases": {}}
+    print(f"{'Case':<20}{'Seconds':>10}{'Accesses/s':>14}{'Instr/s':>12}{'Peak MB':>10}")
+    for name in names:
+        case = results["cases"][name] = measure(name, args.scale, args.engine, args.repeat)
+        print(f"{name:<20}{case['seconds']:>10.3f}{case['accesses_per_second']:>14,}"
+              f"{case['instructions_per_second']:>12,}{case['peak_rss_mb']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.threshold, args.memory_threshold)
+        for problem in problems:
+            print(f'REGRESSION {problem}')
+        if problems:
+            sys.exit(1)
+        print(f'No regressions against {args.baseline}.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from array import array
+
+from policies import make_policy
+from vm import PAGE_SHIFT
+
+# Tag value stored in a slot that holds no valid block
+INVALID = -1
+
+
+class Cache:
+    """
+    Set-associative cache indexed by physical address.
+    Tracks its own hit/miss counters and the cycles spent on cache accesses.
+    Replacement is done by a per-set policy from policies.py; OPT needs the
+    next_use index of the run's physical block stream, RND draws from rng.
+    With config.coalesce, consecutive probes of the same block (the 4-byte
+    steps of an instruction fetch) are counted as hits without a lookup,
+    for the policies where that is exact (repeat_safe).
+    """
+
+    def __init__(self, config, next_use=None, rng=None):
+        self.cache_size = config.cache_size
+        self.block_size = config.block_size
+        self.associativity = config.associativity
+        self.replacement_policy = config.replacement_policy.upper()
+        self.rows = config.rows
+        self.total_blocks = config.total_blocks
+        self.block_offset = config.block_offset
+        self.index = config.index
+        self.index_mask = (1 << config.index) - 1
+        self.miss_penalty = 4 * config.num_memory_reads
+        self.policy = make_policy(self.replacement_policy, self.rows, self.associativity, next_use, rng)
+        self.coalesce = config.coalesce and self.policy.repeat_safe
+
+        # CACHE STRUCTURE
+        # One flat tag array, slot = row * associativity + way
+        self.tags = array('q', [INVALID]) * (self.rows * self.associativity)
+
+        # Residency index: the slots holding blocks of one physical page form
+        # a doubly linked list, page_head[ppn] -> next_slot[slot] -> ... -> -1,
+        # so invalidating a page only visits its own blocks
+        self.page_shift = PAGE_SHIFT - self.block_offset # block number -> ppn
+        self.page_head = array('i', [-1]) * config.pages
+        self.next_slot = array('i', [-1]) * len(self.tags)
+        self.prev_slot = array('i', [-1]) * len(self.tags)
+
+        self.accesses = 0
+        self.hits = 0
+        self.misses = 0
+        self.compulsory_misses = 0
+        self.conflict_misses = 0
+        self.cycles = 0
+
+    def access(self, phys_addr, is_instruction):
+        """
+        Simulates cache access.
+        is_instruction: Boolean, True if this is an EIP fetch (affects cycle count)
+        """
+        self.access_batch((phys_addr,), (is_instruction,))
+
+    def access_batch(self, phys_addrs, flags):
+        """
+        Simulates a batch of cache accesses in order; flags[i] is is_instruction
+        for phys_addrs[i]. A None address (no page could be mapped) is skipped.
+        Counters are kept in locals for the batch and stored once at the end.
+        """
+        tags = self.tags
+        page_head, next_slot, prev_slot = self.page_head, self.next_slot, self.prev_slot
+        page_shift = self.page_shift
+        associativity = self.associativity
+        block_offset = self.block_offset
+        index_mask = self.index_mask
+        index = self.index
+        miss_penalty = self.miss_penalty
+        policy = self.policy
+        touch = policy.touch if policy.tracks_hits else None
+        fill = policy.fill if policy.tracks_fills else None
+        victim = policy.victim
+        coalesce = self.coalesce
+        # Block probed last; only valid within a batch, invalidations happen between batches
+        last_block = -1
+
+        accesses = hits = misses = compulsory = conflict = cycles = 0
+
+        for phys_addr, is_instruction in zip(phys_addrs, flags):
+            if phys_addr is None:
+                continue
+            accesses += 1
+
+            block = phys_addr >> block_offset
+            if block == last_block and coalesce:
+                # The block was just hit or filled: a hit
+                hits += 1
+                cycles += 1
+                continue
+            last_block = block
+
+            row_idx = block & index_mask
+            tag = block >> index
+            base = row_idx * associativity
+            row = tags[base:base + associativity]
+
+            # 1. CHECK FOR HIT
+            if tag in row:
+                if touch is not None:
+                    touch(row_idx, row.index(tag))
+                hits += 1
+                cycles += 1 # 1 cycle for cache hit
+                continue
+
+            # 2. HANDLE MISS
+            misses += 1
+            cycles += miss_penalty
+
+            # Try to find an empty slot (Compulsory Miss)
+            if INVALID in row:
+                compulsory += 1
+                way = row.index(INVALID)
+            else:
+                # Conflict Miss (Cache is full, need replacement)
+                conflict += 1
+
+                way = victim(row_idx)
+
+                # The victim leaves its page's list
+                following, preceding = next_slot[base + way], prev_slot[base + way]
+                if preceding < 0:
+                    page_head[((row[way] << index) | row_idx) >> page_shift] = following
+                else:
+                    next_slot[preceding] = following
+                if following >= 0:
+                    prev_slot[following] = preceding
+
+            slot = base + way
+            tags[slot] = tag
+            if fill is not None:
+                fill(row_idx, way)
+
+            # The filled slot goes to the front of its page's list
+            ppn = block >> page_shift
+            following = page_head[ppn]
+            next_slot[slot], prev_slot[slot] = following, -1
+            if following >= 0:
+                prev_slot[following] = slot
+            page_head[ppn] = slot
+
+            # Add cycle for Effective Address Calculation (only for Data, not Instructions)
+            if not is_instruction:
+                cycles += 1
+
+        self.accesses += accesses
+        self.hits += hits
+        self.misses += misses
+        self.compulsory_misses += compulsory
+        self.conflict_misses += conflict
+        self.cycles += cycles
+
+    def invalidate_page(self, ppn):
+        """
+        Invalidates every cache block that belongs to the given physical page.
+        Only the slots listed for that page in the residency index are touched.
+        """
+        tags, next_slot = self.tags, self.next_slot
+        slot = self.page_head[ppn]
+        self.page_head[ppn] = -1
+        while slot >= 0:
+            tags[slot] = INVALID # Invalidate!
+            slot = next_slot[slot]
+
+    def get_state(self):
+        """
+        Tags, replacement state and counters for a checkpoint.
+        """
+        return {"tags": self.tags, "policy": self.policy.get_state(),
+                "counters": [self.accesses, self.hits, self.misses, self.compulsory_misses,
+                             self.conflict_misses, self.cycles]}
+
+    def set_state(self, state):
+        self.tags[:] = state["tags"]
+        self.policy.set_state(state["policy"])
+        (self.accesses, self.hits, self.misses, self.compulsory_misses,
+         self.conflict_misses, self.cycles) = state["counters"]
+
+        # The residency index follows from the tags (block = tag << index | row)
+        self.page_head[:] = array('i', [-1]) * len(self.page_head)
+        for slot, tag in enumerate(self.tags):
+            if tag != INVALID:
+                ppn = ((tag << self.index) | (slot // self.associativity)) >> self.page_shift
+                following = self.page_head[ppn]
+                self.next_slot[slot], self.prev_slot[slot] = following, -1
+                if following >= 0:
+                    self.prev_slot[following] = slot
+                self.page_head[ppn] = slot
+
+    def unused_blocks(self):
+        """
+        Counts the blocks that are not holding valid data.
+        """
+        return self.tags.count(INVALID)
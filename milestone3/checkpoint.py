@@ -0,0 +1,114 @@
+import json
+import os
+import struct
+import zlib
+from array import array
+
+# --- CHECKPOINT FORMAT ---
+# Header: magic, version, 3 pad bytes, metadata length, CRC32 of everything after the header
+# Metadata: JSON (config, trace files, seed, instruction count), readable without the rest
+# State: zlib of [state JSON length][state JSON][array sections]; arrays in the
+# state are replaced by {"@array": n} and stored raw as [typecode][item count][items]
+CHECKPOINT_MAGIC = b"SIMCKPT\x00"
+CHECKPOINT_VERSION = 1
+HEADER = struct.Struct("<8sBxxxII")
+LENGTH = struct.Struct("<Q")
+ARRAY = struct.Struct("<cQ")
+
+
+def _flatten(value, arrays):
+    if isinstance(value, array):
+        arrays.append(value)
+        return {"@array": len(arrays) - 1}
+    if isinstance(value, dict):
+        return {key: _flatten(item, arrays) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_flatten(item, arrays) for item in value]
+    return value
+
+
+def _unflatten(value, arrays):
+    if isinstance(value, dict):
+        if "@array" in value:
+            return arrays[value["@array"]]
+        return {key: _unflatten(item, arrays) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unflatten(item, arrays) for item in value]
+    return value
+
+
+def write_checkpoint(path, meta, state):
+    """
+    Saves a simulator state (nested dicts / lists of JSON values and arrays).
+    The file is written next to path and renamed over it, so a crash never
+    leaves a half-written checkpoint behind.
+    """
+    arrays = []
+    state_json = json.dumps(_flatten(state, arrays)).encode()
+    compressor = zlib.compressobj()
+    parts = [compressor.compress(LENGTH.pack(len(state_json))), compressor.compress(state_json)]
+    for values in arrays:
+        parts.append(compressor.compress(ARRAY.pack(values.typecode.encode(), len(values))))
+        parts.append(compressor.compress(values.tobytes()))
+    parts.append(compressor.flush())
+
+    meta_json = json.dumps(meta).encode()
+    crc = zlib.crc32(meta_json)
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(meta_json), crc))
+        out.write(meta_json)
+        for part in parts:
+            out.write(part)
+    os.replace(tmp_path, path)
+
+
+def _read_header(path, f):
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f'{path} is truncated or corrupt (checksum mismatch).')
+    magic, version, meta_length, crc = HEADER.unpack(header)
+    if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+        raise ValueError(f'{path} is not a version {CHECKPOINT_VERSION} simulator checkpoint.')
+    return meta_length, crc
+
+
+def read_checkpoint_meta(path):
+    """
+    The metadata of a checkpoint (config, trace files, seed, instruction count).
+    """
+    with open(path, "rb") as f:
+        meta_length, _ = _read_header(path, f)
+        return json.loads(f.read(meta_length))
+
+
+def read_checkpoint(path):
+    """
+    Returns (metadata, state) of a checkpoint written by write_checkpoint().
+    """
+    with open(path, "rb") as f:
+        meta_length, crc = _read_header(path, f)
+        rest = f.read()
+    if zlib.crc32(rest) != crc or len(rest) < meta_length:
+        raise ValueError(f'{path} is truncated or corrupt (checksum mismatch).')
+
+    meta = json.loads(rest[:meta_length])
+    body = zlib.decompress(rest[meta_length:])
+    (state_length,) = LENGTH.unpack_from(body)
+    offset = LENGTH.size
+    state = json.loads(body[offset:offset + state_length])
+    offset += state_length
+
+    arrays = []
+    while offset < len(body):
+        typecode, count = ARRAY.unpack_from(body, offset)
+        offset += ARRAY.size
+        values = array(typecode.decode())
+        size = count * values.itemsize
+        values.frombytes(body[offset:offset + size])
+        offset += size
+        arrays.append(values)
+    return meta, _unflatten(state, arrays)
@@ -0,0 +1,245 @@
+import math
+from dataclasses import dataclass, replace
+
+from policies import POLICY_NAMES
+from rng import RNG_KINDS, np
+
+# Constants
+PAGE_SIZE = 4096 # 4 KB the standard page size
+PTE_ENTRIES_PER_PROCESS = 524288 # 512K entries in the page table
+MAX_TRACE_FILES = 3
+
+COST_PER_KB = 0.07
+
+
+@dataclass
+class SimConfig:
+    """
+    Cache and physical memory parameters for one simulation.
+    The calculated values (rows, tag size, pages, ...) are derived from these.
+    """
+    cache_size: int           # KB
+    block_size: int           # bytes
+    associativity: int
+    replacement_policy: str   # RR, RND, FIFO, LRU, PLRU, LFU or OPT (cache and pages)
+    physical_memory: int      # MB
+    utilization: int          # % of physical memory used by the OS
+    instructions: int = -1    # Instructions / Time Slice, -1 = All
+
+    # Random replacement: seed None = different every run; rng "numpy" = batched NumPy Generator
+    seed: int = None
+    rng: str = "python"
+
+    # Warm-up: instructions simulated before the counters start (before each
+    # sample window when sampling). Sampling: measure sample_window
+    # instructions out of every sample_period, fast-forward the rest.
+    warmup: int = 0
+    sample_window: int = 0    # 0 = no sampling, simulate everything
+    sample_period: int = 0
+
+    # Merge back-to-back probes of one cache block (only where counters stay exact)
+    coalesce: bool = True
+
+    # TLB (tlb_entries 0 = no TLB, translation is free until a page fault)
+    tlb_entries: int = 0
+    tlb_associativity: int = 4
+    tlb_policy: str = "LRU"   # LRU, RR or RND
+    tlb_flush: bool = False   # flush on context switch instead of ASID tags
+    tlb_miss_penalty: int = 10 # cycles per TLB miss (page walk)
+
+    def validate(self):
+        """
+        Raises ValueError describing the first out of range parameter.
+        """
+        cache_size = self.cache_size
+        if cache_size is None or not (8 <= cache_size <= 8192):
+            raise ValueError('Cache Size must be between 8 and 8192 KB.')
+
+        block_size = self.block_size
+        if block_size is None or not (8 <= block_size <= 64) or (block_size & (block_size - 1)) != 0:
+            raise ValueError('Block Size must be 8, 16, 32, or 64 bytes.')
+
+        valid_associativity = {1, 2, 4, 8, 16}
+        if self.associativity is None or self.associativity not in valid_associativity:
+            raise ValueError('Associativity must be 1, 2, 4, 8, or 16.')
+
+        replacement_policy = self.replacement_policy
+        if replacement_policy is None or replacement_policy.upper() not in POLICY_NAMES:
+            raise ValueError('Replacement Policy must be RR (Round Robin), RND (Random), FIFO, LRU, PLRU, LFU or OPT.')
+
+        physical_memory = self.physical_memory
+        if physical_memory is None or not (128 <= physical_memory <= 4096) or (physical_memory & (physical_memory - 1)) != 0:
+            raise ValueError('Physical Memory must be a power of 2 between 128 and 4096 MB.')
+
+        utilization = self.utilization
+        if utilization is None or not (0 <= utilization <= 100):
+            raise ValueError('Utilization must be between 0 and 100%.')
+
+        instructions = self.instructions
+        if instructions is None or not (instructions == -1 or instructions >= 1):
+            raise ValueError('Instructions / Time Slice must be -1 or a positive integer.')
+
+        if self.seed is not None and self.seed < 0:
+            raise ValueError('Seed must be 0 or a positive integer.')
+        if self.rng not in RNG_KINDS:
+            raise ValueError(f'Random source must be one of: {", ".join(RNG_KINDS)}.')
+        if self.rng == "numpy" and np is None:
+            raise ValueError('The numpy random source needs NumPy.')
+
+        if self.warmup is None or self.warmup < 0:
+            raise ValueError('Warm-up must be 0 or a positive instruction count.')
+        if self.sample_window:
+            if self.sample_window < 0:
+                raise ValueError('Sample Window must be 0 (no sampling) or a positive instruction count.')
+            if self.sample_period is None or self.sample_period < self.sample_window + self.warmup:
+                raise ValueError('Sample Period must be at least the Sample Window plus the Warm-up.')
+
+        if self.tlb_entries:
+            if self.tlb_entries < 0 or (self.tlb_entries & (self.tlb_entries - 1)) != 0:
+                raise ValueError('TLB Entries must be 0 (no TLB) or a power of 2.')
+            if self.tlb_associativity not in {1, 2, 4, 8, 16} or self.tlb_associativity > self.tlb_entries:
+                raise ValueError('TLB Associativity must be 1, 2, 4, 8, or 16 and at most the TLB Entries.')
+            if self.tlb_policy is None or self.tlb_policy.upper() not in {'LRU', 'RR', 'RND'}:
+                raise ValueError('TLB Replacement Policy must be LRU, RR (Round Robin) or RND (Random).')
+            if self.tlb_miss_penalty < 0:
+                raise ValueError('TLB Miss Penalty must be 0 or more cycles.')
+
+    def with_cache(self, cache_size, block_size, associativity, replacement_policy):
+        """
+        Copy of this config with different cache parameters (same memory setup).
+        """
+        return replace(self, cache_size=cache_size, block_size=block_size,
+                       associativity=associativity, replacement_policy=replacement_policy)
+
+    # 1. Cache Calculated Values
+
+    @property
+    def replacement_policy_str(self):
+        return POLICY_NAMES[self.replacement_policy.upper()]
+
+    @property
+    def total_blocks(self):
+        return int((self.cache_size * 1024) / self.block_size)
+
+    @property
+    def rows(self):
+        return int(self.total_blocks / self.associativity)
+
+    @property
+    def block_offset(self):
+        return int(math.log2(self.block_size))
+
+    @property
+    def index(self):
+        return int(math.log2(self.rows))
+
+    @property
+    def physical_memory_bytes(self):
+        return self.physical_memory * (2**20) # MB to Bytes
+
+    @property
+    def physical_memory_bits(self):
+        return int(math.log2(self.physical_memory_bytes))
+
+    @property
+    def tag(self):
+        return int(self.physical_memory_bits - self.index - self.block_offset)
+
+    @property
+    def overhead_bits(self):
+        return (self.tag + 1) * self.total_blocks
+
+    @property
+    def overhead(self):
+        return self.overhead_bits / 8
+
+    @property
+    def footprint(self):
+        return self.cache_size * 1024 + self.overhead
+
+    @property
+    def cost(self):
+        return (self.footprint / 1024) * COST_PER_KB
+
+    @property
+    def num_memory_reads(self):
+        # Memory reads required to fill one cache block (used in CPI)
+        return math.ceil(self.block_size / 4)
+
+    # 2. Physical Memory Calculated Values
+
+    @property
+    def pages(self):
+        return int(self.physical_memory_bytes / PAGE_SIZE)
+
+    @property
+    def system_pages(self):
+        return int(math.ceil((self.utilization / 100) * self.pages))
+
+    @property
+    def pages_available(self):
+        # Total pool of pages for ALL user processes
+        return self.pages - self.system_pages
+
+    @property
+    def page_bits(self):
+        return int(math.log2(self.pages))
+
+    @property
+    def pte_bits(self):
+        # Page Table Entry (PTE) Size: PPN + 1 Valid Bit
+        return self.page_bits + 1
+
+    def page_table_ram(self, num_processes):
+        """
+        Total RAM (bytes) for the page tables of num_processes processes.
+        """
+        return (PTE_ENTRIES_PER_PROCESS * num_processes * self.pte_bits) / 8
+
+
+def validate_trace_files(trace_files):
+    """
+    Raises ValueError unless between 1 and MAX_TRACE_FILES trace files are given.
+    """
+    num_trace_files = len(trace_files) if trace_files else 0
+    if not (1 <= num_trace_files <= MAX_TRACE_FILES):
+        raise ValueError(f'Must specify between 1 and {MAX_TRACE_FILES} Trace Files. You provided {num_trace_files}.')
+
+
+def parse_model(spec):
+    """
+    Parses a cache model written as SIZE,BLOCK,ASSOC,POLICY (e.g. 64,16,4,RR).
+    Returns the (cache_size, block_size, associativity, replacement_policy) tuple.
+    """
+    parts = [part.strip() for part in spec.split(',')]
+    if len(parts) != 4 or not all(part.isdigit() for part in parts[:3]):
+        raise ValueError(f"Cache model '{spec}' must be SIZE,BLOCK,ASSOC,POLICY (e.g. 64,16,4,RR).")
+    return int(parts[0]), int(parts[1]), int(parts[2]), parts[3]
+
+
+def parse_geometry(spec):
+    """
+    Parses a stack-distance geometry written as BLOCK,SETS (e.g. 16,256).
+    """
+    parts = [part.strip() for part in spec.split(',')]
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Stack-distance geometry '{spec}' must be BLOCK,SETS (e.g. 16,256).")
+    block_size, sets = int(parts[0]), int(parts[1])
+    if not (8 <= block_size <= 64) or (block_size & (block_size - 1)) != 0:
+        raise ValueError('Block Size must be 8, 16, 32, or 64 bytes.')
+    if sets < 1 or (sets & (sets - 1)) != 0:
+        raise ValueError(f'Stack-distance set count must be a power of 2 (got {sets}).')
+    return block_size, sets
+
+
+def read_models_file(path):
+    """
+    Reads one cache model per line (see parse_model). Blank lines and # comments are ignored.
+    """
+    models = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                models.append(parse_model(line))
+    return models
@@ -0,0 +1,195 @@
+from dataclasses import dataclass
+
+from traces import EIP, DST, SRC, iter_blocks
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, only the bulk decoder needs it
+    np = None
+
+HAVE_NUMPY = np is not None
+
+CHUNK_BYTES = 1 << 24 # 16 MB of trace text per decoded chunk
+
+if HAVE_NUMPY:
+    # ASCII hex digit -> value, anything else -> 0
+    HEX_VALUES = np.zeros(256, dtype=np.int64)
+    HEX_VALUES[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+    HEX_VALUES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+    HEX_VALUES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+    HEX_SHIFTS = np.arange(28, -1, -4, dtype=np.int64)
+
+    COMPILED_DTYPE = np.dtype([("kind", "u1"), ("length", "u1"), ("address", "<u4")])
+
+# Zero padding so fixed-column reads past the last line stay in bounds
+PAD = 64
+ZERO, DASH = ord("0"), ord("-")
+
+
+@dataclass
+class TraceChunk:
+    """
+    One decoded block of a trace, one row per cache access.
+    EIP fetches are already expanded into their 4-byte-stride accesses,
+    so 'length' repeats the instruction length on each of its rows.
+    """
+    process_id: object      # uint8 array
+    kind: object            # uint8 array of EIP / DST / SRC
+    address: object         # int64 array of virtual addresses
+    length: object          # uint8 array
+    instructions: int       # EIP records in the chunk
+    instruction_bytes: int  # sum of their lengths
+
+
+@dataclass
+class RecordChunk:
+    """
+    One decoded block of a trace, one row per record, before expand_records().
+    Slicing gives the records of a range of rows.
+    """
+    kind: object            # uint8 array of EIP / DST / SRC
+    length: object          # int array
+    address: object         # int array of virtual addresses
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __getitem__(self, rows):
+        return RecordChunk(self.kind[rows], self.length[rows], self.address[rows])
+
+    def eip_rows(self):
+        """
+        Row numbers of the EIP records, in order.
+        """
+        return np.flatnonzero(self.kind == EIP)
+
+    def records(self):
+        """
+        The (kind, length, address) tuples traces.iter_record_batches yields.
+        """
+        return list(zip(self.kind.tolist(), self.length.tolist(), self.address.tolist()))
+
+
+def _require_numpy():
+    if not HAVE_NUMPY:
+        raise RuntimeError('The bulk trace decoder requires NumPy (pip install numpy).')
+
+
+def _hex8(buf, pos):
+    digits = buf[pos[:, None] + np.arange(8)]
+    return (HEX_VALUES[digits] << HEX_SHIFTS).sum(axis=1), (digits == ZERO).all(axis=1)
+
+
+def expand_records(kind, length, address, process_id):
+    """
+    Expands (kind, length, address) record arrays into one row per access,
+    the same way the simulator steps through an instruction 4 bytes at a time.
+    """
+    kind = np.asarray(kind, dtype=np.uint8)
+    length = np.asarray(length, dtype=np.uint8)
+    address = np.asarray(address, dtype=np.int64)
+
+    is_eip = kind == EIP
+    counts = np.where(is_eip, (length.astype(np.int64) + 3) // 4, 1)
+    record = np.repeat(np.arange(len(kind)), counts)
+    step = np.arange(len(record)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return TraceChunk(
+        process_id=np.full(len(record), process_id, dtype=np.uint8),
+        kind=kind[record],
+        address=address[record] + 4 * step,
+        length=length[record],
+        instructions=int(is_eip.sum()),
+        instruction_bytes=int(length[is_eip].sum(dtype=np.int64)),
+    )
+
+
+def decode_text_records(data):
+    """
+    Decodes a buffer of complete text trace lines into a RecordChunk.
+    Skip rules match traces.parse_text_trace.
+    """
+    _require_numpy()
+    raw = np.frombuffer(data, dtype=np.uint8)
+    buf = np.concatenate([raw, np.zeros(PAD, dtype=np.uint8)])
+
+    starts = np.concatenate([[0], np.flatnonzero(raw == ord("\n")) + 1])
+    starts = starts[starts < len(raw)]
+
+    c0, c1, c2, c3 = buf[starts], buf[starts + 1], buf[starts + 2], buf[starts + 3]
+    eip = starts[(c0 == ord("E")) & (c1 == ord("I")) & (c2 == ord("P"))]
+    mem = starts[(c0 == ord("d")) & (c1 == ord("s")) & (c2 == ord("t")) & (c3 == ord("M"))]
+
+    # EIP (04): 7c809767 - decimal length, hex address
+    eip_length = (buf[eip + 5].astype(np.int64) - ZERO) * 10 + (buf[eip + 6].astype(np.int64) - ZERO)
+    eip_address, _ = _hex8(buf, eip + 10)
+
+    # dstM: 0012f4a8 00000000    srcM: 0012f4a8 00000000
+    dst_address, dst_zero = _hex8(buf, mem + 6)
+    dst_used = (buf[mem + 15] != DASH) & ~dst_zero
+    src_address, src_zero = _hex8(buf, mem + 33)
+    src_used = (buf[mem + 44] != DASH) & ~src_zero
+
+    # Interleave back into file order: EIP, then dstM, then srcM of a line
+    position = np.concatenate([eip * 4, mem[dst_used] * 4 + 1, mem[src_used] * 4 + 2])
+    order = np.argsort(position, kind="stable")
+    kind = np.concatenate([
+        np.full(len(eip), EIP, dtype=np.uint8),
+        np.full(int(dst_used.sum()), DST, dtype=np.uint8),
+        np.full(int(src_used.sum()), SRC, dtype=np.uint8),
+    ])[order]
+    length = np.concatenate([eip_length, np.full(len(kind) - len(eip), 4, dtype=np.int64)])[order]
+    address = np.concatenate([eip_address, dst_address[dst_used], src_address[src_used]])[order]
+    return RecordChunk(kind, length, address)
+
+
+def decode_compiled_records(data):
+    """
+    Decodes packed compiled-trace records into a RecordChunk.
+    """
+    _require_numpy()
+    records = np.frombuffer(data, dtype=COMPILED_DTYPE)
+    # Copies: data may be a view of a mapped file that is closed after the last block
+    return RecordChunk(records["kind"].copy(), records["length"].copy(), records["address"].astype(np.int64))
+
+
+def decode_text(data, process_id=0):
+    """
+    Decodes a buffer of complete text trace lines into a TraceChunk.
+    """
+    records = decode_text_records(data)
+    return expand_records(records.kind, records.length, records.address, process_id)
+
+
+def decode_compiled(data, process_id=0):
+    """
+    Decodes packed compiled-trace records into a TraceChunk.
+    """
+    records = decode_compiled_records(data)
+    return expand_records(records.kind, records.length, records.address, process_id)
+
+
+def iter_trace_chunks(path, process_id=0, chunk_bytes=CHUNK_BYTES):
+    """
+    Yields TraceChunks for a text or compiled trace (plain, gzip/xz or '-' for stdin),
+    reading chunk_bytes at a time.
+    """
+    _require_numpy()
+    for compiled, block in iter_blocks(path, chunk_bytes):
+        if compiled:
+            yield decode_compiled(block, process_id)
+        else:
+            yield decode_text(block, process_id)
+
+
+def iter_record_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """
+    Yields RecordChunks for a text or compiled trace, like iter_trace_chunks()
+    but without expanding the instructions into their accesses.
+    """
+    _require_numpy()
+    for compiled, block in iter_blocks(path, chunk_bytes):
+        if compiled:
+            yield decode_compiled_records(block)
+        else:
+            yield decode_text_records(block)
@@ -1,7 +1,9 @@
-import subprocess
-import re
 import csv
 
+from config import SimConfig
+from simulator import Simulator
+from sweep import run_sweep
+
 trace_files = [
     "A-10_new_1.5_a.pdf.trc",
     "A-9_new_trunk1.trc",
@@ -15,56 +17,65 @@ cache_sizes = [8, 64, 256, 1024]
 block_sizes = [8, 16, 64]
 policies = ["RR", "RND"]
 associativity = 4  # 4-way for the main comparison
+seed = 17  # RND runs are reproducible, so their sweep cells can be cached
 
+# Graph sources: results_lru_sizes.csv (one stack-distance pass per trace)
+# for Graph1_MissRate_vs_Size.png; results.csv (the RR / RND matrix, which
+# a stack-distance pass cannot give) for Graph2_CPI_vs_BlockSize.png and
+# Graph3_RR_vs_RND.png
 output_csv = "results.csv"
+size_sweep_csv = "results_lru_sizes.csv"
 
 def run_simulation():
-    with open(output_csv, "w", newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["Trace File", "Cache Size (KB)", "Block Size (B)", "Policy", "Hit Rate (%)", "CPI"])
+    # RR / RND matrix for Graphs 2 and 3. Same memory setup as "-p 1024 -u 0 -n -1" for every run
+    base = SimConfig(cache_size=cache_sizes[0], block_size=block_sizes[0], associativity=associativity,
+                     replacement_policy=policies[0], physical_memory=1024, utilization=0, instructions=-1, seed=seed)
 
-        print(f"Starting soon... Output will be saved to {output_csv}")
+    models = [base.with_cache(size, block, associativity, policy)
+              for size in cache_sizes for block in block_sizes for policy in policies]
 
-        for trace in trace_files:
-            for size in cache_sizes:
-                for block in block_sizes:
-                    for policy in policies:
-                        print(f"Running: {trace} | {size}KB | {block}B | {policy}...")
-
-                        # Note: Uses -n -1 to run the whole file
-                        cmd = [
-                            "python", "main.py",
-                            "-s", str(size),
-                            "-b", str(block),
-                            "-a", str(associativity),
-                            "-r", policy,
-                            "-p", "1024", 
-                            "-u", "0",
-                            "-n", "-1",
-                            "-f", trace
-                        ]
-
-                        try:
-                            # Run the simulator and capture output
-                            result = subprocess.run(cmd, capture_output=True, text=True)
-                            output = result.stdout
-
-                            # Regex to find Hit Rate and CPI in output
-                            # Looks for "Hit Rate:      97.9658%"
-                            hit_match = re.search(r"Hit Rate:\s+([\d\.]+)", output)
-                            # Looks for "CPI:           4.02"
-                            cpi_match = re.search(r"CPI:\s+([\d\.]+)", output)
-
-                            hit_rate = hit_match.group(1) if hit_match else "Error"
-                            cpi = cpi_match.group(1) if cpi_match else "Error"
-
-                            # Write
-                            writer.writerow([trace, size, block, policy, hit_rate, cpi])
-
-                        except Exception as e:
-                            print(f"Failed on {trace}: {e}")
+    print(f"Starting soon... Output will be saved to {output_csv}")
+
+    # Runs on every core; cells finished by an earlier (or interrupted) sweep are reused
+    run_sweep(base, trace_files, models, output_csv)
 
     print("Done! written to results.csv")
 
+
+def run_size_sweep():
+    """
+    Miss rate vs cache size (Graph 1) for LRU caches, from one stack-distance
+    pass per trace instead of one simulation per cache size. This CSV, not
+    results.csv, is the source of Graph 1.
+    """
+    base = SimConfig(cache_size=cache_sizes[0], block_size=block_sizes[0], associativity=associativity,
+                     replacement_policy=policies[0], physical_memory=1024, utilization=0, instructions=-1, seed=seed)
+    simulator = Simulator(base)
+
+    # Each (size, block) cell at our associativity is one set count
+    geometries = [(block, size * 1024 // (block * associativity)) for size in cache_sizes for block in block_sizes]
+
+    with open(size_sweep_csv, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Trace File", "Cache Size (KB)", "Block Size (B)", "Policy", "Hit Rate (%)", "Miss Rate (%)", "CPI"])
+
+        for trace in trace_files:
+            print(f"Stack distance: {trace} | {len(geometries)} geometries in one pass...")
+
+            try:
+                rows = simulator.run_stack_distance([trace], geometries, max_associativity=associativity)
+            except Exception as e:
+                print(f"Failed on {trace}: {e}")
+                continue
+
+            for row in rows:
+                if row.associativity == associativity:
+                    writer.writerow([trace, f"{row.cache_size:g}", row.block_size, "LRU",
+                                     f"{row.hit_rate:.4f}", f"{row.miss_rate:.4f}", f"{row.cpi:.2f}"])
+
+    print(f"Done! written to {size_sweep_csv}")
+
+
 if __name__ == "__main__":
+    run_size_sweep()
     run_simulation()
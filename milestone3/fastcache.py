@@ -0,0 +1,194 @@
+from array import array
+
+from cache import INVALID, Cache
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, only the compiled engine needs it
+    np = None
+
+try:
+    import numba
+except ImportError: # Numba is optional, only the compiled engine needs it
+    numba = None
+
+HAVE_NUMBA = numba is not None and np is not None
+
+# --engine choices. The numba engine compiles the cache access loop only:
+# address translation stays in vm.VirtualMemory (Python, NumPy lookups
+# while free pages remain), since page faults call back into the page
+# policy and invalidate cache blocks.
+ENGINES = ("python", "numba")
+
+# Policies the compiled kernel implements; the rest always run in Python
+# (RND has to draw from Python's random to give the same results)
+COMPILED_POLICIES = {"RR": 0, "FIFO": 1, "LRU": 2}
+
+# Slots of the counters array shared with the kernel
+ACCESSES, HITS, MISSES, COMPULSORY, CONFLICT, CYCLES, CLOCK = range(7)
+
+
+def _access_kernel(tags, phys_addrs, flags, block_offset, index_mask, index, associativity,
+                   miss_penalty, policy, coalesce, rr_counters, stamps, counters,
+                   page_shift, page_head, next_slot, prev_slot):
+    """
+    Cache.access_batch over NumPy arrays (-1 = no address). Replacement is
+    RR (rr_counters per set) or FIFO / LRU (stamps per slot, from counters[CLOCK]).
+    Keeps the residency index (page_head / next_slot / prev_slot) like Cache does.
+    """
+    accesses = hits = misses = compulsory = conflict = cycles = 0
+    clock = counters[CLOCK]
+    last_block = -1
+
+    for i in range(phys_addrs.shape[0]):
+        phys_addr = phys_addrs[i]
+        if phys_addr < 0:
+            continue
+        accesses += 1
+
+        block = phys_addr >> block_offset
+        if block == last_block and coalesce:
+            hits += 1
+            cycles += 1
+            continue
+        last_block = block
+
+        row_idx = block & index_mask
+        tag = block >> index
+        base = row_idx * associativity
+
+        way = -1
+        empty = -1
+        for w in range(associativity):
+            slot_tag = tags[base + w]
+            if slot_tag == tag:
+                way = w
+                break
+            if slot_tag == INVALID and empty < 0:
+                empty = w
+
+        if way >= 0:
+            if policy == 2:
+                stamps[base + way] = clock
+                clock += 1
+            hits += 1
+            cycles += 1
+            continue
+
+        misses += 1
+        cycles += miss_penalty
+        if empty >= 0:
+            compulsory += 1
+            way = empty
+        else:
+            conflict += 1
+            if policy == 0:
+                way = rr_counters[row_idx] % associativity
+                rr_counters[row_idx] += 1
+            else:
+                way = 0
+                for w in range(1, associativity):
+                    if stamps[base + w] < stamps[base + way]:
+                        way = w
+
+            # The victim leaves its page's list
+            following = next_slot[base + way]
+            preceding = prev_slot[base + way]
+            if preceding < 0:
+                page_head[((tags[base + way] << index) | row_idx) >> page_shift] = following
+            else:
+                next_slot[preceding] = following
+            if following >= 0:
+                prev_slot[following] = preceding
+
+        # The filled slot goes to the front of its page's list
+        slot = base + way
+        tags[slot] = tag
+        ppn = block >> page_shift
+        following = page_head[ppn]
+        next_slot[slot] = following
+        prev_slot[slot] = -1
+        if following >= 0:
+            prev_slot[following] = slot
+        page_head[ppn] = slot
+
+        if policy != 0:
+            stamps[base + way] = clock
+            clock += 1
+
+        if not flags[i]:
+            cycles += 1
+
+    counters[ACCESSES] += accesses
+    counters[HITS] += hits
+    counters[MISSES] += misses
+    counters[COMPULSORY] += compulsory
+    counters[CONFLICT] += conflict
+    counters[CYCLES] += cycles
+    counters[CLOCK] = clock
+
+
+if HAVE_NUMBA:
+    _access_kernel = numba.njit(cache=True, nogil=True)(_access_kernel)
+
+
+class CompiledCache(Cache):
+    """
+    Cache whose access loop runs in the compiled kernel above.
+    The tag array and the RR counters are shared with the kernel through
+    NumPy views, so invalidate_page(), unused_blocks() and the Python
+    policy state stay valid. Gives the same counters as Cache.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.policy_kind = COMPILED_POLICIES[self.replacement_policy]
+        self.tag_view = np.frombuffer(self.tags, dtype=np.int64)
+        if self.policy_kind == 0:
+            self.rr_view = np.frombuffer(self.policy.counters, dtype=np.int64)
+        else:
+            self.rr_view = np.zeros(1, dtype=np.int64)
+        self.stamps = np.zeros(len(self.tags), dtype=np.int64)
+        self.counters = np.zeros(7, dtype=np.int64)
+        self.residency_views = [np.frombuffer(links, dtype=np.int32)
+                                for links in (self.page_head, self.next_slot, self.prev_slot)]
+
+    def get_state(self):
+        state = super().get_state()
+        if self.policy_kind:
+            # FIFO / LRU order of each set in use, from the stamps, in the
+            # same form the Python policy saves it: checkpoints work with either engine
+            stamps = self.stamps.reshape(self.rows, self.associativity)
+            in_use = np.flatnonzero((self.tag_view.reshape(self.rows, self.associativity) != INVALID).any(axis=1))
+            ways = np.argsort(stamps[in_use], axis=1, kind="stable")
+            pairs = np.stack([np.repeat(in_use, self.associativity), ways.ravel()], axis=1)
+            state["policy"] = {"order": array('q', pairs.astype(np.int64).tobytes())}
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        if self.policy_kind:
+            pairs = np.frombuffer(state["policy"]["order"], dtype=np.int64).reshape(-1, 2)
+            self.stamps[:] = 0
+            self.stamps[pairs[:, 0] * self.associativity + pairs[:, 1]] = np.arange(1, len(pairs) + 1)
+            self.counters[CLOCK] = len(pairs) + 1
+
+    def access_batch(self, phys_addrs, flags):
+        try:
+            addresses = np.asarray(phys_addrs, dtype=np.int64)
+        except TypeError:
+            # None = no page could be mapped
+            addresses = np.array([-1 if phys_addr is None else phys_addr for phys_addr in phys_addrs], dtype=np.int64)
+        before = self.counters.copy()
+        _access_kernel(self.tag_view, addresses, np.asarray(flags, dtype=np.bool_),
+                                 self.block_offset, self.index_mask, self.index, self.associativity,
+                                 self.miss_penalty, self.policy_kind, self.coalesce,
+                                 self.rr_view, self.stamps, self.counters, self.page_shift,
+                                 *self.residency_views)
+        delta = (self.counters - before).tolist()
+        self.accesses += delta[ACCESSES]
+        self.hits += delta[HITS]
+        self.misses += delta[MISSES]
+        self.compulsory_misses += delta[COMPULSORY]
+        self.conflict_misses += delta[CONFLICT]
+        self.cycles += delta[CYCLES]
@@ -0,0 +1,36 @@
+from collections import deque
+
+
+class FrameAllocator:
+    """
+    Pool of free physical page frames [first, end).
+    Untouched frames are handed out in ascending PPN order by a bump pointer,
+    frames given back with free() are reused first (oldest first).
+    Both allocate() and free() are O(1).
+    """
+
+    def __init__(self, first, end):
+        self.next_frame = first
+        self.end = end
+        self.released = deque()
+
+    def allocate(self):
+        """
+        Returns a free PPN, or None when the pool is empty.
+        """
+        if self.released:
+            return self.released.popleft()
+        if self.next_frame < self.end:
+            ppn = self.next_frame
+            self.next_frame += 1
+            return ppn
+        return None
+
+    def free(self, ppn):
+        """
+        Gives a frame back to the pool.
+        """
+        self.released.append(ppn)
+
+    def __len__(self):
+        return len(self.released) + (self.end - self.next_frame)
@@ -0,0 +1,145 @@
+import csv
+import struct
+import sys
+import zlib
+from array import array
+from itertools import count
+
+# --- INTERVAL STATISTICS ---
+# --interval N: every N instructions, one row per cache model and process,
+# plus an overall row (process ALL_PROCESSES). Rows are kept column by column
+# and written in bulk every FLUSH_ROWS rows, as CSV (.csv) or in a columnar
+# binary format:
+# Header: magic, version, 3 pad bytes, length of the column names, then the
+# column names (comma separated, ASCII)
+# Row group: row count, then per column: compressed size and the
+# zlib-compressed column (row count int64, little endian)
+COLUMNS = ("interval", "end_instruction", "model", "process", "instructions", "accesses",
+           "hits", "misses", "compulsory_misses", "conflict_misses", "page_faults", "cycles")
+COUNTERS = COLUMNS[4:] # what the Simulator counts per (model, process)
+ALL_PROCESSES = -1
+
+STATS_MAGIC = b"TRCS"
+STATS_VERSION = 1
+HEADER = struct.Struct("<4sBxxxI")
+GROUP = struct.Struct("<I")
+
+FLUSH_ROWS = 65536
+
+
+def interval_schedule(every):
+    """
+    (interval, stop) segments of every instructions each, for
+    pipeline.instruction_phases.
+    """
+    for interval in count():
+        yield interval, (interval + 1) * every
+
+
+class IntervalStats:
+    """
+    Interval statistics of a run (--interval), written to path: columnar
+    unless the path ends in .csv. The Simulator adds one interval at a time
+    with add_interval(); close() (or leaving a with block) writes the rest.
+    The file is only created by the first write.
+    """
+
+    def __init__(self, path, every, columnar=None):
+        if every < 1:
+            raise ValueError('The interval must be at least 1 instruction.')
+        self.path = path
+        self.every = every
+        self.columnar = not path.endswith(".csv") if columnar is None else columnar
+        self.columns = [array('q') for _ in COLUMNS]
+        self.rows = 0 # written or buffered
+        self.out = None
+
+    def _open(self):
+        if self.columnar:
+            self.out = open(self.path, "wb")
+            names = ",".join(COLUMNS).encode("ascii")
+            self.out.write(HEADER.pack(STATS_MAGIC, STATS_VERSION, len(names)) + names)
+        else:
+            self.out = open(self.path, "w", newline="")
+            self.writer = csv.writer(self.out)
+            self.writer.writerow(COLUMNS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_interval(self, interval, end_instruction, counts):
+        """
+        Adds the rows of one interval. counts[model][process] holds the
+        COUNTERS of that process in the interval; they are reset to 0.
+        """
+        columns = self.columns
+        for model, processes in enumerate(counts):
+            total = [sum(column) for column in zip(*processes)]
+            for process, values in [(ALL_PROCESSES, total)] + list(enumerate(processes)):
+                for column, value in zip(columns, (interval, end_instruction, model, process, *values)):
+                    column.append(value)
+                values[:] = [0] * len(values)
+                self.rows += 1
+        if len(columns[0]) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.out is None:
+            self._open()
+        columns = self.columns
+        if not columns[0]:
+            return
+        if self.columnar:
+            self.out.write(GROUP.pack(len(columns[0])))
+            for column in columns:
+                if sys.byteorder == "big":
+                    column.byteswap()
+                data = zlib.compress(column.tobytes())
+                self.out.write(GROUP.pack(len(data)) + data)
+        else:
+            self.writer.writerows(zip(*columns))
+        self.columns = [array('q') for _ in COLUMNS]
+
+    def close(self):
+        if self.out is None or not self.out.closed:
+            self.flush()
+            self.out.close()
+
+
+def read_intervals(path):
+    """
+    {column: array of int64} of an interval statistics file, CSV or columnar.
+    """
+    columns = {name: array('q') for name in COLUMNS}
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+        if head[:len(STATS_MAGIC)] != STATS_MAGIC:
+            f.seek(0)
+            for row in csv.DictReader(line.decode("ascii") for line in f):
+                for name in COLUMNS:
+                    columns[name].append(int(row[name]))
+            return columns
+
+        magic, version, names_length = HEADER.unpack(head)
+        if version != STATS_VERSION:
+            raise ValueError(f'{path} is not a version {STATS_VERSION} interval statistics file.')
+        names = f.read(names_length).decode("ascii").split(",")
+        while True:
+            group = f.read(GROUP.size)
+            if not group:
+                break
+            (rows,) = GROUP.unpack(group)
+            for name in names:
+                (size,) = GROUP.unpack(f.read(GROUP.size))
+                column = array('q')
+                column.frombytes(zlib.decompress(f.read(size)))
+                if len(column) != rows:
+                    raise ValueError(f'{path} is truncated or corrupt.')
+                if sys.byteorder == "big":
+                    column.byteswap()
+                if name in columns:
+                    columns[name].extend(column)
+    return columns
@@ -0,0 +1,276 @@
+from dataclasses import dataclass
+
+from decoder import iter_record_chunks, iter_trace_chunks, np
+from scheduler import round_robin, round_robin_chunks
+from traces import EIP, iter_record_batches
+from vm import PAGE_SHIFT
+
+# --- TRACE PIPELINE ---
+# read -> decode (traces.iter_record_batches) -> schedule (scheduler.round_robin)
+# -> expand -> translate -> cache (model.access_batch)
+# Every stage works on whole batches, so a stage's per-call overhead is paid
+# once per batch, and memory stays bounded by the batch size.
+
+
+@dataclass
+class StreamTotals:
+    """
+    Per-run totals of the trace stream itself (independent of the cache).
+    """
+    instruction_count: int = 0
+    instruction_bytes: int = 0
+    src_dst_bytes: int = 0
+
+
+def instruction_window(scheduled, start, stop=None):
+    """
+    Keeps the records of instructions [start, stop) of a scheduled stream,
+    counting instructions from 0 in schedule order (stop None = to the end).
+    An instruction's dstM/srcM records stay with it; records before the
+    first instruction count as instruction 0. Stops reading at 'stop'.
+    """
+    if stop == 0:
+        return
+    seen = 0 # instructions started so far
+    for process_id, records in scheduled:
+        # Leading dstM/srcM records belong to the last instruction of the previous batch
+        first = 0 if seen > start or start == 0 else None
+        last = len(records)
+        for i, record in enumerate(records):
+            if record[0] != EIP:
+                continue
+            if seen == start and first is None:
+                first = i
+            if seen == stop:
+                last = i
+                break
+            seen += 1
+
+        if first is not None and first < last:
+            yield process_id, records[first:last]
+        if stop is not None and seen >= stop and last < len(records):
+            return
+
+
+def instruction_phases(scheduled, phases):
+    """
+    Splits a scheduled stream at instruction counts. phases yields (phase,
+    stop) segments (see sampling.phase_schedule), each holding the
+    instructions from the previous stop up to its own. Yields (segment,
+    process_id, records); an instruction's dstM/srcM records stay with it.
+    """
+    phases = iter(phases)
+    segment = next(phases)
+    stop = segment[1]
+    seen = 0 # instructions started so far
+    for process_id, records in scheduled:
+        if stop is None or stop - seen >= len(records):
+            # No phase boundary in this batch
+            seen += sum(1 for record in records if record[0] == EIP)
+            yield segment, process_id, records
+            continue
+
+        first = 0
+        for i, record in enumerate(records):
+            if record[0] != EIP:
+                continue
+            while seen == stop:
+                if first < i:
+                    yield segment, process_id, records[first:i]
+                first = i
+                segment = next(phases)
+                stop = segment[1]
+            seen += 1
+        if first < len(records):
+            yield segment, process_id, records[first:]
+
+
+def chunk_phases(scheduled, phases):
+    """
+    instruction_phases() over (process_id, decoder.RecordChunk) batches:
+    the same segments, cut at the EIP rows of each chunk.
+    """
+    phases = iter(phases)
+    segment = next(phases)
+    stop = segment[1]
+    seen = 0 # instructions started before this chunk
+    for process_id, chunk in scheduled:
+        eip_rows = chunk.eip_rows()
+        first = 0
+        # The instruction numbered 'stop' starts the next segment
+        while stop is not None and stop - seen < len(eip_rows):
+            cut = eip_rows[stop - seen]
+            if first < cut:
+                yield segment, process_id, chunk[first:cut]
+            first = cut
+            segment = next(phases)
+            stop = segment[1]
+        seen += len(eip_rows)
+        if first < len(chunk):
+            yield segment, process_id, chunk[first:] if first else chunk
+
+
+def expand(scheduled, totals):
+    """
+    Expand stage: turns (process_id, records) into (process_id, addresses,
+    is_instruction) access batches, stepping each instruction 4 bytes at a time.
+    """
+    for process_id, records in scheduled:
+        addresses = []
+        flags = []
+        instructions = 0
+        instruction_bytes = 0
+        data_accesses = 0
+
+        for kind, length, address in records:
+            # PROCESS INSTRUCTION FETCH (EIP)
+            if kind == EIP:
+                instructions += 1
+                instruction_bytes += length
+                steps = range(address, address + length, 4)
+                addresses.extend(steps)
+                flags.extend([True] * len(steps))
+
+            # PROCESS DATA ACCESS (dstM / srcM)
+            else:
+                data_accesses += 1
+                addresses.append(address)
+                flags.append(False)
+
+        totals.instruction_count += instructions
+        totals.instruction_bytes += instruction_bytes
+        totals.src_dst_bytes += 4 * data_accesses
+        yield process_id, addresses, flags
+
+
+def expand_pages(records, totals):
+    """
+    Fast-forward form of expand() for one batch of one process: the same
+    accesses, but back-to-back accesses to one page are merged into the
+    first. Returns (addresses, repeats): the first address of every page
+    run and the number of accesses merged away.
+    """
+    addresses = []
+    append = addresses.append
+    last_page = -1
+    accesses = 0
+    instructions = 0
+    instruction_bytes = 0
+    data_accesses = 0
+
+    for kind, length, address in records:
+        if kind == EIP:
+            instructions += 1
+            instruction_bytes += length
+            steps = (length + 3) // 4
+            if not steps:
+                continue
+            accesses += steps
+            # An instruction spans at most two pages: its first and last 4-byte step
+            for step in (address, address + 4 * (steps - 1)):
+                page = step >> PAGE_SHIFT
+                if page != last_page:
+                    append(step)
+                    last_page = page
+        else:
+            data_accesses += 1
+            accesses += 1
+            page = address >> PAGE_SHIFT
+            if page != last_page:
+                append(address)
+                last_page = page
+
+    totals.instruction_count += instructions
+    totals.instruction_bytes += instruction_bytes
+    totals.src_dst_bytes += 4 * data_accesses
+    return addresses, accesses - len(addresses)
+
+
+def expand_chunk_pages(chunk, totals):
+    """
+    expand_pages() for a decoder.RecordChunk, in NumPy: the same
+    (addresses, repeats), without going through the records one by one.
+    """
+    is_eip = chunk.kind == EIP
+    length = chunk.length.astype(np.int64)
+    address = chunk.address.astype(np.int64)
+    steps = np.where(is_eip, (length + 3) // 4, 1)
+
+    # First and last 4-byte step of every record (the same address for data
+    # accesses), in access order; instructions of length 0 have none
+    ends = np.stack([address, address + 4 * (steps - 1)], axis=1)[steps > 0].ravel()
+    pages = ends >> PAGE_SHIFT
+    runs = np.flatnonzero(np.diff(pages, prepend=-1))
+
+    instructions = int(is_eip.sum())
+    totals.instruction_count += instructions
+    totals.instruction_bytes += int(length[is_eip].sum())
+    totals.src_dst_bytes += 4 * (len(is_eip) - instructions)
+    return ends[runs].tolist(), int(steps.sum()) - len(runs)
+
+
+def bulk_expand(trace_files, totals):
+    """
+    Read + decode + expand in one step with the NumPy decoder (whole traces in order).
+    """
+    for process_id, tracefile in enumerate(trace_files):
+        for chunk in iter_trace_chunks(tracefile, process_id):
+            is_instruction = chunk.kind == EIP
+            totals.instruction_count += chunk.instructions
+            totals.instruction_bytes += chunk.instruction_bytes
+            totals.src_dst_bytes += 4 * (len(is_instruction) - int(is_instruction.sum()))
+            yield process_id, chunk.address.tolist(), is_instruction.tolist()
+
+
+def translate(access_batches, vm):
+    """
+    Translate stage: yields (phys_addrs, is_instruction) batches.
+    A batch stops right before an access that has to evict a page, and that
+    access is yielded on its own. Since the stages are lazy, the cache has
+    already seen every earlier access when the eviction invalidates its blocks,
+    exactly as if each access were simulated one at a time.
+    """
+    for process_id, addresses, flags in access_batches:
+        start = 0
+        while start < len(addresses):
+            phys_addrs, stop = vm.translate_batch(addresses, process_id, start)
+            if phys_addrs:
+                yield phys_addrs, flags[start:stop]
+            if stop < len(addresses):
+                # Page fault: evicts and invalidates now
+                yield [vm.translate(addresses[stop], process_id)], flags[stop:stop + 1]
+                stop += 1
+            start = stop
+
+
+def phase_batches(trace_files, quantum, phases):
+    """
+    The read .. schedule stages split into phases: yields (segment, process_id,
+    records), see instruction_phases(). The caller expands each batch.
+    """
+    streams = [iter_record_batches(tracefile) for tracefile in trace_files]
+    return instruction_phases(round_robin(streams, quantum), phases)
+
+
+def phase_chunks(trace_files, quantum, phases):
+    """
+    phase_batches() with the NumPy decoder: yields (segment, process_id,
+    chunk) with decoder.RecordChunks. SKIP segments can be fast-forwarded
+    with expand_chunk_pages(); chunk.records() gives the records of the others.
+    """
+    streams = [iter_record_chunks(tracefile) for tracefile in trace_files]
+    return chunk_phases(round_robin_chunks(streams, quantum), phases)
+
+
+def access_batches(trace_files, quantum, bulk_decode, totals, start=0, stop=None):
+    """
+    The read .. expand stages for a set of traces (one process each),
+    limited to instructions [start, stop) when given.
+    """
+    if bulk_decode and quantum == -1 and start == 0 and stop is None:
+        return bulk_expand(trace_files, totals)
+    streams = [iter_record_batches(tracefile) for tracefile in trace_files]
+    scheduled = round_robin(streams, quantum)
+    if start or stop is not None:
+        scheduled = instruction_window(scheduled, start, stop)
+    return expand(scheduled, totals)
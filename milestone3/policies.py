@@ -0,0 +1,371 @@
+import heapq
+import random
+from array import array
+from collections import OrderedDict
+
+from rng import rng_state, set_rng_state
+
+# Next-use position of an access whose key never comes back
+NEVER = (1 << 62)
+
+
+class ReplacementPolicy:
+    """
+    Replacement state of 'sets' sets of 'ways' ways each.
+    The owner reports every hit (touch) and every fill of a way, and asks
+    for a victim only when all ways of a set hold valid entries. Since
+    every way of a full set has been filled since it was last invalidated,
+    policies never need to hear about invalidations.
+    """
+    name = None
+    # touch() / fill() do something: the owner may skip calling them if not
+    tracks_hits = False
+    tracks_fills = False
+    # Touching the way that was just touched or filled changes nothing, so
+    # back-to-back hits on one entry can be merged into one
+    repeat_safe = True
+    # Hits only matter through the order in which ways were last touched, so
+    # a run of touches can be replayed as the last touch of each way, in order
+    recency_only = False
+
+    def __init__(self, sets, ways):
+        self.sets = sets
+        self.ways = ways
+
+    def touch(self, set_idx, way):
+        pass
+
+    def fill(self, set_idx, way):
+        pass
+
+    def victim(self, set_idx):
+        raise NotImplementedError
+
+    def get_state(self):
+        """
+        Replacement state for a checkpoint: JSON values and arrays.
+        """
+        return {}
+
+    def set_state(self, state):
+        pass
+
+
+class RoundRobin(ReplacementPolicy):
+    """
+    Each set cycles through its ways with its own counter.
+    """
+    name = "RR"
+
+    def __init__(self, sets, ways):
+        super().__init__(sets, ways)
+        self.counters = array('q', [0]) * sets
+
+    def victim(self, set_idx):
+        counter = self.counters[set_idx]
+        self.counters[set_idx] = counter + 1
+        return counter % self.ways
+
+    def get_state(self):
+        return {"counters": self.counters}
+
+    def set_state(self, state):
+        self.counters[:] = state["counters"]
+
+
+class Random(ReplacementPolicy):
+    """
+    Uniform random victim from rng (anything with randint, default the random module).
+    """
+    name = "RND"
+
+    def __init__(self, sets, ways, rng=None):
+        super().__init__(sets, ways)
+        self.rng = rng or random
+
+    def victim(self, set_idx):
+        return self.rng.randint(0, self.ways - 1)
+
+    def get_state(self):
+        return {"rng": rng_state(self.rng)}
+
+    def set_state(self, state):
+        set_rng_state(self.rng, state["rng"])
+
+
+class FIFO(ReplacementPolicy):
+    """
+    Evicts the way filled longest ago. Per set, an OrderedDict of ways in fill order.
+    """
+    name = "FIFO"
+    tracks_fills = True
+
+    def __init__(self, sets, ways):
+        super().__init__(sets, ways)
+        # Sets are created on their first fill, large caches stay cheap
+        self.order = [None] * sets
+
+    def fill(self, set_idx, way):
+        order = self.order[set_idx]
+        if order is None:
+            order = self.order[set_idx] = OrderedDict()
+        order.pop(way, None)
+        order[way] = None
+
+    def victim(self, set_idx):
+        return next(iter(self.order[set_idx]))
+
+    def get_state(self):
+        # (set, way) pairs, each set oldest first
+        order = array('q')
+        for set_idx, ways in enumerate(self.order):
+            for way in ways or ():
+                order.extend((set_idx, way))
+        return {"order": order}
+
+    def set_state(self, state):
+        self.order = [None] * self.sets
+        order = state["order"]
+        for i in range(0, len(order), 2):
+            self.fill(order[i], order[i + 1])
+
+
+class LRU(FIFO):
+    """
+    Evicts the least recently used way: a hit moves its way to the back.
+    """
+    name = "LRU"
+    tracks_hits = True
+    recency_only = True
+
+    def touch(self, set_idx, way):
+        self.order[set_idx].move_to_end(way)
+
+
+class TreePLRU(ReplacementPolicy):
+    """
+    Tree pseudo-LRU: one bit per inner node of a binary tree over the ways
+    points to the half that was used less recently. Way counts that are not a
+    power of 2 use the smallest tree that fits, the victim walk never leaves
+    the real ways.
+    """
+    name = "PLRU"
+    tracks_hits = True
+    tracks_fills = True
+    recency_only = True # each node points away from the subtree touched last
+
+    def __init__(self, sets, ways):
+        super().__init__(sets, ways)
+        self.levels = max(ways - 1, 0).bit_length()
+        # One byte per node, set after set: node n of set s (heap order,
+        # root 1) is bits[s * nodes + n], so touch and victim are O(log ways)
+        self.nodes = 1 << self.levels
+        self.bits = array('B', bytes(sets * self.nodes))
+
+    def touch(self, set_idx, way):
+        bits = self.bits
+        base = set_idx * self.nodes
+        node = 1
+        for level in range(self.levels - 1, -1, -1):
+            if (way >> level) & 1:
+                bits[base + node] = 0 # went right: point left
+                node = 2 * node + 1
+            else:
+                bits[base + node] = 1 # went left: point right
+                node = 2 * node
+
+    fill = touch
+
+    def victim(self, set_idx):
+        bits = self.bits
+        base = set_idx * self.nodes
+        node = 1
+        way = 0
+        for level in range(self.levels - 1, -1, -1):
+            right = way | (1 << level)
+            if bits[base + node] and right < self.ways:
+                way = right
+                node = 2 * node + 1
+            else:
+                node = 2 * node
+        return way
+
+    def get_state(self):
+        return {"bits": self.bits}
+
+    def set_state(self, state):
+        self.bits[:] = state["bits"]
+
+
+class LFU(ReplacementPolicy):
+    """
+    Evicts the least frequently used way, the oldest one among equals.
+    Per set, ways are bucketed by use count and the smallest count is tracked,
+    so hits, fills and victims are all O(1).
+    """
+    name = "LFU"
+    tracks_hits = True
+    tracks_fills = True
+    repeat_safe = False
+
+    def __init__(self, sets, ways):
+        super().__init__(sets, ways)
+        # Per set: [way -> count, count -> OrderedDict of ways, smallest count]
+        self.state = [None] * sets
+
+    def touch(self, set_idx, way):
+        state = self.state[set_idx]
+        counts, buckets, min_count = state
+        count = counts[way]
+        bucket = buckets[count]
+        del bucket[way]
+        if not bucket:
+            del buckets[count]
+            if min_count == count:
+                state[2] = count + 1
+        counts[way] = count + 1
+        buckets.setdefault(count + 1, OrderedDict())[way] = None
+
+    def fill(self, set_idx, way):
+        state = self.state[set_idx]
+        if state is None:
+            state = self.state[set_idx] = [{}, {}, 1]
+        counts, buckets, _ = state
+        count = counts.get(way)
+        if count is not None:
+            # Refill of an evicted or invalidated way
+            bucket = buckets[count]
+            del bucket[way]
+            if not bucket:
+                del buckets[count]
+        counts[way] = 1
+        buckets.setdefault(1, OrderedDict())[way] = None
+        state[2] = 1
+
+    def victim(self, set_idx):
+        _, buckets, min_count = self.state[set_idx]
+        return next(iter(buckets[min_count]))
+
+    def get_state(self):
+        # (set, way, count) triples, each set in victim order
+        entries = array('q')
+        for set_idx, state in enumerate(self.state):
+            if state is not None:
+                for count in sorted(state[1]):
+                    for way in state[1][count]:
+                        entries.extend((set_idx, way, count))
+        return {"entries": entries}
+
+    def set_state(self, state):
+        self.state = [None] * self.sets
+        entries = state["entries"]
+        for i in range(0, len(entries), 3):
+            set_idx, way, count = entries[i:i + 3]
+            set_state = self.state[set_idx]
+            if set_state is None:
+                set_state = self.state[set_idx] = [{}, {}, count]
+            set_state[0][way] = count
+            set_state[1].setdefault(count, OrderedDict())[way] = None
+            set_state[2] = min(set_state[2], count)
+
+
+class Optimal(ReplacementPolicy):
+    """
+    Belady's OPT: evicts the way whose entry is used again furthest in the future.
+    Offline only: next_use[i] is the position of the next access to the key
+    of access i (see next_use_index), and every access must be reported, in
+    order, as exactly one touch or fill. A per-set max-heap of next uses with
+    lazy deletion finds the victim in O(log ways).
+    """
+    name = "OPT"
+    tracks_hits = True
+    tracks_fills = True
+    repeat_safe = False
+
+    def __init__(self, sets, ways, next_use):
+        super().__init__(sets, ways)
+        self.next_use = next_use
+        self.position = 0
+        self.slot_next_use = array('q', [NEVER]) * (sets * ways)
+        self.heaps = [None] * sets
+
+    def touch(self, set_idx, way):
+        next_use = self.next_use[self.position]
+        self.position += 1
+        self.slot_next_use[set_idx * self.ways + way] = next_use
+
+        heap = self.heaps[set_idx]
+        if heap is None:
+            heap = self.heaps[set_idx] = []
+        heapq.heappush(heap, (-next_use, way))
+        if len(heap) > 4 * self.ways + 16:
+            # Too many stale entries: rebuild from the live values
+            base = set_idx * self.ways
+            heap[:] = [(-self.slot_next_use[base + w], w) for w in range(self.ways)]
+            heapq.heapify(heap)
+
+    fill = touch
+
+    def victim(self, set_idx):
+        heap = self.heaps[set_idx]
+        base = set_idx * self.ways
+        while True:
+            next_use, way = heapq.heappop(heap)
+            if self.slot_next_use[base + way] == -next_use:
+                return way
+
+    def get_state(self):
+        used = array('q', (set_idx for set_idx, heap in enumerate(self.heaps) if heap is not None))
+        return {"position": self.position, "slot_next_use": self.slot_next_use, "used_sets": used}
+
+    def set_state(self, state):
+        self.position = state["position"]
+        self.slot_next_use[:] = state["slot_next_use"]
+        # Heaps hold the live next uses of every way of the sets in use
+        self.heaps = [None] * self.sets
+        for set_idx in state["used_sets"]:
+            base = set_idx * self.ways
+            heap = self.heaps[set_idx] = [(-self.slot_next_use[base + way], way) for way in range(self.ways)]
+            heapq.heapify(heap)
+
+
+POLICIES = {policy.name: policy for policy in (RoundRobin, Random, FIFO, LRU, TreePLRU, LFU, Optimal)}
+
+POLICY_NAMES = {
+    "RR": "Round Robin",
+    "RND": "Random",
+    "FIFO": "First In First Out",
+    "LRU": "Least Recently Used",
+    "PLRU": "Tree Pseudo-LRU",
+    "LFU": "Least Frequently Used",
+    "OPT": "Belady Optimal",
+}
+
+
+def make_policy(name, sets, ways, next_use=None, rng=None):
+    """
+    Replacement policy by its -r name. OPT needs the next_use index of the
+    run, RND draws from rng.
+    """
+    policy = POLICIES[name.upper()]
+    if policy is Optimal:
+        if next_use is None:
+            raise ValueError('OPT replacement needs the next-use index of the trace.')
+        return Optimal(sets, ways, next_use)
+    if policy is Random:
+        return Random(sets, ways, rng)
+    return policy(sets, ways)
+
+
+def next_use_index(keys):
+    """
+    next_use[i] = position of the next access with the same key as access i,
+    NEVER if there is none. keys is a sequence of ints.
+    """
+    next_use = array('q', [NEVER]) * len(keys)
+    last_seen = {}
+    for i in range(len(keys) - 1, -1, -1):
+        key = keys[i]
+        next_use[i] = last_seen.get(key, NEVER)
+        last_seen[key] = i
+    return next_use
@@ -0,0 +1,111 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # Not on Windows: peak memory comes from tracemalloc instead
+    resource = None
+
+# Timed pipeline stages, in report order
+STAGES = ("parse", "translate", "cache", "invalidate")
+
+
+class RunProfile:
+    """
+    Wall-clock time per pipeline stage and throughput of a run (--profile).
+    The Simulator wraps its stages with timed() / timed_call() only when it
+    has a RunProfile, so runs without one pay nothing.
+    Stages nest (translate pulls batches from parse, its page faults
+    invalidate cache blocks): each stage is charged its own time only.
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        # Time spent in nested stages, one entry per stage running
+        self.nested = []
+        self.wall_seconds = 0.0
+        self.invalidations = 0 # pages whose cache blocks were dropped
+        self.accesses = 0      # accesses translated
+        self.instructions = 0
+        self.peak_rss = 0      # bytes
+
+    @contextmanager
+    def running(self):
+        """
+        Times the whole run and records the peak memory when it ends.
+        """
+        traced = resource is None and not tracemalloc.is_tracing()
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_seconds += time.perf_counter() - start
+            if resource is not None:
+                # ru_maxrss is KB on Linux
+                self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            else:
+                self.peak_rss = max(self.peak_rss, tracemalloc.get_traced_memory()[1])
+                if traced:
+                    tracemalloc.stop()
+
+    def timed(self, iterable, stage):
+        """
+        Yields the items of iterable, adding the time spent producing them to stage.
+        Translated (phys_addrs, flags) batches are counted as accesses.
+        """
+        clock = time.perf_counter
+        iterator = iter(iterable)
+        count = stage == "translate"
+        while True:
+            self.nested.append(0.0)
+            start = clock()
+            item = next(iterator, None)
+            self._charge(stage, clock() - start)
+            if item is None:
+                return
+            if count:
+                self.accesses += len(item[0])
+            yield item
+
+    def timed_call(self, function, stage):
+        """
+        function wrapped to add its run time to stage.
+        """
+        clock = time.perf_counter
+        nested = self.nested
+        invalidate = stage == "invalidate"
+
+        def timed_function(*args):
+            nested.append(0.0)
+            start = clock()
+            result = function(*args)
+            self._charge(stage, clock() - start)
+            if invalidate:
+                self.invalidations += 1
+            return result
+        return timed_function
+
+    def _charge(self, stage, elapsed):
+        self.seconds[stage] += elapsed - self.nested.pop()
+        if self.nested:
+            self.nested[-1] += elapsed
+
+    def stage_seconds(self):
+        """
+        {stage: seconds}, plus "other" for the rest of the wall time
+        (setup, OPT pre-passes, results).
+        """
+        seconds = dict(self.seconds)
+        seconds["other"] = max(self.wall_seconds - sum(seconds.values()), 0.0)
+        return seconds
+
+    @property
+    def accesses_per_second(self):
+        return self.accesses / self.wall_seconds if self.wall_seconds else 0
+
+    @property
+    def instructions_per_second(self):
+        return self.instructions / self.wall_seconds if self.wall_seconds else 0
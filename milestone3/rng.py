@@ -0,0 +1,76 @@
+import random
+import secrets
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, only the batched random source needs it
+    np = None
+
+# --rng choices
+RNG_KINDS = ("python", "numpy")
+
+VICTIM_BATCH = 4096 # victim indices drawn per NumPy call
+
+# Independent random streams of one run. Each cache model draws from its
+# own CACHE_STREAM, so its results do not depend on which models share the pass.
+VM_STREAM, CACHE_STREAM, TLB_STREAM = range(3)
+
+
+def run_seed(seed):
+    """
+    The seed a run uses: the configured one, or fresh entropy if None.
+    """
+    return secrets.randbits(64) if seed is None else seed
+
+
+def rng_state(rng):
+    """
+    JSON-friendly state of a random source (random.Random, the random module or BatchedRandom).
+    """
+    return rng.getstate()
+
+
+def set_rng_state(rng, state):
+    if isinstance(state, dict):
+        rng.setstate(state)
+    else:
+        # random.Random: (version, internal state tuple, gauss_next)
+        rng.setstate((state[0], tuple(state[1]), state[2]))
+
+
+def make_rng(kind, seed, stream):
+    """
+    Random source for one stream of a run: anything with randint(a, b).
+    """
+    if kind == "numpy":
+        return BatchedRandom(np.random.default_rng([stream, seed]))
+    return random.Random(f"{seed}/{stream}")
+
+
+class BatchedRandom:
+    """
+    randint() served from blocks of VICTIM_BATCH integers pre-generated by a
+    NumPy Generator, one block per (a, b) range, so a victim costs a list
+    pop instead of a Python-level randint call.
+    """
+
+    def __init__(self, generator, batch=VICTIM_BATCH):
+        self.generator = generator
+        self.batch = batch
+        self.buffers = {}
+
+    def randint(self, a, b):
+        buffer = self.buffers.get((a, b))
+        if not buffer:
+            buffer = self.generator.integers(a, b, endpoint=True, size=self.batch).tolist()
+            buffer.reverse() # pop() from the end hands them out in order
+            self.buffers[(a, b)] = buffer
+        return buffer.pop()
+
+    def getstate(self):
+        return {"bit_generator": self.generator.bit_generator.state,
+                "buffers": [[a, b, buffer] for (a, b), buffer in self.buffers.items()]}
+
+    def setstate(self, state):
+        self.generator.bit_generator.state = state["bit_generator"]
+        self.buffers = {(a, b): buffer for a, b, buffer in state["buffers"]}
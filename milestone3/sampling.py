@@ -0,0 +1,73 @@
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+
+# --- WARM-UP AND SAMPLING ---
+# Phases of the instruction stream. WARM and MEASURE instructions are
+# simulated in detail (translate -> cache), only MEASURE ones are counted.
+# SKIP instructions are fast-forwarded: translated, so the page tables stay
+# warm, but never fed to the cache.
+SKIP, WARM, MEASURE = range(3)
+# Instructions simulated before the checkpoint a run was resumed from
+RESUMED = -1
+
+CONFIDENCE = 0.95
+
+
+@dataclass
+class Sample:
+    """
+    Counters of one measured window.
+    """
+    instructions: int = 0
+    accesses: int = 0
+    hits: int = 0
+    cycles: int = 0
+
+
+def phase_schedule(config):
+    """
+    (phase, stop) pairs of a run, each phase running from the previous stop
+    to its own (None = to the end of the traces).
+    Without sampling: config.warmup WARM instructions, then MEASURE.
+    With sampling, every config.sample_period instructions end with a
+    MEASURE window of config.sample_window instructions, preceded by
+    config.warmup WARM instructions; the rest of the period is skipped.
+    """
+    warmup, window, period = config.warmup, config.sample_window, config.sample_period
+    if not window:
+        yield WARM, warmup
+        yield MEASURE, None
+        return
+    start = 0
+    while True:
+        yield SKIP, start + period - window - warmup
+        yield WARM, start + period - window
+        yield MEASURE, start + period
+        start += period
+
+
+def resumed_schedule(phases, start):
+    """
+    A (phase, stop) schedule counted from instruction 'start' on, behind a
+    RESUMED phase that covers the instructions before it.
+    """
+    yield RESUMED, start
+    for phase, stop in phases:
+        yield phase, None if stop is None else start + stop
+
+
+def ratio_interval(numerators, denominators, confidence=CONFIDENCE):
+    """
+    Half width of the confidence interval of sum(numerators) / sum(denominators)
+    estimated from per-window pairs (ratio estimator, normal approximation).
+    0 with fewer than 2 windows.
+    """
+    n = len(numerators)
+    total = sum(denominators)
+    if n < 2 or total == 0:
+        return 0
+    ratio = sum(numerators) / total
+    variance = sum((y - ratio * x) ** 2 for y, x in zip(numerators, denominators)) / (n - 1)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return z * math.sqrt(variance / n) / (total / n)
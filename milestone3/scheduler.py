@@ -0,0 +1,101 @@
+from traces import EIP
+
+
+def round_robin(batch_streams, quantum):
+    """
+    Schedule stage: interleaves per-process record batches like a round-robin
+    scheduler. batch_streams[i] yields lists of (kind, length, address) records
+    of process i and is only read as far as the current time slice needs.
+    The running process switches after 'quantum' instructions; the dstM/srcM
+    accesses of the last instruction stay in its slice. quantum -1 runs each
+    process to completion in order. Yields (process_id, records).
+    """
+    if quantum == -1:
+        for process_id, batches in enumerate(batch_streams):
+            for records in batches:
+                yield process_id, records
+        return
+
+    runnable = [(process_id, iter(batches)) for process_id, batches in enumerate(batch_streams)]
+    # Batch that was cut at the end of a time slice, and where its rest starts
+    # (kept whole: slicing off the rest every slice is quadratic in the batch size)
+    carried = {}
+
+    while runnable:
+        still_running = []
+        for process_id, batches in runnable:
+            budget = quantum # instructions left in this time slice
+
+            while True:
+                records, first = carried.pop(process_id, (None, 0))
+                if records is None:
+                    records = next(batches, None)
+                    if records is None:
+                        break # process finished
+
+                cut = None
+                for i in range(first, len(records)):
+                    if records[i][0] == EIP:
+                        if budget == 0:
+                            cut = i
+                            break
+                        budget -= 1
+
+                if cut is None:
+                    if first < len(records):
+                        yield process_id, records[first:] if first else records
+                    continue
+
+                # Time slice over: the instruction at 'cut' runs next turn
+                if cut > first:
+                    yield process_id, records[first:cut]
+                carried[process_id] = (records, cut)
+                still_running.append((process_id, batches))
+                break
+        runnable = still_running
+
+
+def round_robin_chunks(chunk_streams, quantum):
+    """
+    round_robin() over decoder.RecordChunk streams: the same time slices,
+    with the cuts found from the EIP rows of each chunk instead of a loop
+    over its records. Yields (process_id, chunk).
+    """
+    if quantum == -1:
+        for process_id, chunks in enumerate(chunk_streams):
+            for chunk in chunks:
+                yield process_id, chunk
+        return
+
+    runnable = [(process_id, iter(chunks)) for process_id, chunks in enumerate(chunk_streams)]
+    # Chunk that was cut at the end of a time slice: (chunk, its EIP rows, the
+    # row its rest starts at, and that row's index in the EIP rows)
+    carried = {}
+
+    while runnable:
+        still_running = []
+        for process_id, chunks in runnable:
+            budget = quantum # instructions left in this time slice
+
+            while True:
+                chunk, eip_rows, first, next_eip = carried.pop(process_id, (None, None, 0, 0))
+                if chunk is None:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break # process finished
+                    eip_rows = chunk.eip_rows()
+
+                if len(eip_rows) - next_eip <= budget:
+                    budget -= len(eip_rows) - next_eip
+                    if first < len(chunk):
+                        yield process_id, chunk[first:] if first else chunk
+                    continue
+
+                # Time slice over: the instruction at 'cut' runs next turn
+                cut = eip_rows[next_eip + budget]
+                if cut > first:
+                    yield process_id, chunk[first:cut]
+                carried[process_id] = (chunk, eip_rows, cut, next_eip + budget)
+                still_running.append((process_id, chunks))
+                break
+        runnable = still_running
@@ -0,0 +1,567 @@
+from array import array
+from dataclasses import asdict, dataclass, field, replace
+
+from cache import Cache
+from checkpoint import read_checkpoint, write_checkpoint
+from config import MAX_TRACE_FILES, SimConfig, validate_trace_files
+from decoder import HAVE_NUMPY, RecordChunk
+from fastcache import COMPILED_POLICIES, ENGINES, HAVE_NUMBA, CompiledCache
+from intervals import COUNTERS, interval_schedule
+from pipeline import (StreamTotals, access_batches, expand, expand_chunk_pages, expand_pages, phase_batches,
+                      phase_chunks, translate)
+from policies import Optimal, POLICIES, next_use_index
+from rng import CACHE_STREAM, TLB_STREAM, VM_STREAM, make_rng, run_seed
+from sampling import MEASURE, RESUMED, SKIP, WARM, Sample, phase_schedule, ratio_interval, resumed_schedule
+from stackdist import MAX_STACK_DEPTH, StackDistance
+from vm import PAGE_SHIFT, VirtualMemory
+
+# SimConfig fields the state of a checkpoint depends on, and those of each
+# cache model: a run resumes only with the same values. The rest (warm-up,
+# sampling, coalescing, ...) only changes what is counted from there on.
+STATE_FIELDS = ("physical_memory", "utilization", "replacement_policy", "instructions", "seed", "rng",
+                "tlb_entries", "tlb_associativity", "tlb_policy", "tlb_flush")
+MODEL_FIELDS = ("cache_size", "block_size", "associativity", "replacement_policy")
+
+
+@dataclass
+class Results:
+    """
+    Counters collected by one Simulator.run().
+    With a warm-up or sampling, the stream totals, cache counters and
+    total_cycles cover the measured instructions only (samples holds one
+    Sample per window); the page table and TLB counters cover the whole run.
+    """
+    config: object
+    trace_files: list
+    instruction_count: int = 0
+    instruction_bytes: int = 0
+    src_dst_bytes: int = 0
+    total_cycles: int = 0
+    cache_accesses: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    compulsory_misses: int = 0
+    conflict_misses: int = 0
+    unused_cache_blocks: int = 0
+    page_table_hits: int = 0
+    pages_from_free: int = 0
+    total_page_faults: int = 0
+    used_page_table_entries: list = field(default_factory=list)
+    tlb_hits: int = 0
+    tlb_misses: int = 0
+    tlb_flushes: int = 0
+    tlb_cycles: int = 0
+    warmup_instructions: int = 0
+    skipped_instructions: int = 0
+    samples: list = field(default_factory=list)
+
+    @property
+    def virtual_pages_mapped(self):
+        return self.page_table_hits + self.pages_from_free
+
+    @property
+    def tlb_hit_rate(self):
+        if self.tlb_hits + self.tlb_misses > 0:
+            return (self.tlb_hits * 100) / (self.tlb_hits + self.tlb_misses)
+        return 0
+
+    @property
+    def hit_rate(self):
+        if self.cache_accesses > 0:
+            return (self.cache_hits * 100) / self.cache_accesses
+        return 0
+
+    @property
+    def miss_rate(self):
+        if self.cache_accesses > 0:
+            return 100 - self.hit_rate
+        return 0
+
+    @property
+    def cpi(self):
+        if self.instruction_count > 0:
+            return self.total_cycles / self.instruction_count
+        return 0
+
+    @property
+    def hit_rate_ci(self):
+        # +/- of hit_rate (%) at sampling.CONFIDENCE, 0 unless sampled
+        return 100 * ratio_interval([sample.hits for sample in self.samples],
+                                    [sample.accesses for sample in self.samples])
+
+    @property
+    def cpi_ci(self):
+        return ratio_interval([sample.cycles for sample in self.samples],
+                              [sample.instructions for sample in self.samples])
+
+
+class Simulator:
+    """
+    Cache + virtual memory simulator for one SimConfig.
+    Every run() starts from an empty cache and empty page tables, so one
+    Simulator can be reused for many trace sets.
+    bulk_decode selects the NumPy trace decoder (default: when NumPy is installed);
+    it is used for whole-trace runs (-n -1), time-sliced runs decode record batches.
+    engine "numba" runs the cache access loop compiled (RR, FIFO and LRU
+    caches; other policies stay in Python), with the same results. Address
+    translation (page tables, TLB, page faults) runs in Python with either engine.
+    config.warmup / config.sample_window select a warmed-up or sampled run
+    (see sampling.py), which always decodes record batches.
+    With a profiling.RunProfile, the pipeline stages are timed into it.
+    With an intervals.IntervalStats, run() / run_many() also record
+    statistics every intervals.every instructions into it.
+    """
+
+    def __init__(self, config, bulk_decode=None, engine="python", profile=None, intervals=None):
+        config.validate()
+        if engine not in ENGINES:
+            raise ValueError(f'Engine must be one of: {", ".join(ENGINES)}.')
+        if engine == "numba" and not HAVE_NUMBA:
+            raise ValueError('The numba engine needs Numba and NumPy (pip install numba).')
+        self.config = config
+        self.bulk_decode = HAVE_NUMPY if bulk_decode is None else bulk_decode
+        self.engine = engine
+        self.profile = profile
+        self.intervals = intervals
+        if intervals is not None and self._phased():
+            raise ValueError('Interval statistics do not work with warm-up or sampling.')
+
+    def run(self, trace_files):
+        """
+        Simulates the trace files (one process each) and returns the Results.
+        """
+        return self.run_many(trace_files, [self.config])[0]
+
+    def run_many(self, trace_files, cache_configs):
+        """
+        Simulates several cache models against one pass over the traces.
+        The traces are read and translated once, and every physical address
+        is fed to each model's cache. Physical memory and page replacement
+        always come from this Simulator's config, so only the cache
+        parameters of cache_configs matter. Returns one Results per model.
+        """
+        for cache_config in cache_configs:
+            cache_config.validate()
+        seed = run_seed(self.config.seed)
+
+        caches = self._caches(trace_files, cache_configs, seed, self._schedule())
+        return self._run(trace_files, cache_configs, caches, seed)
+
+    def checkpoint(self, trace_files, instruction_count, path):
+        """
+        checkpoint_many() of this Simulator's own cache model.
+        """
+        return self.checkpoint_many(trace_files, instruction_count, path, [self.config])[0]
+
+    def checkpoint_many(self, trace_files, instruction_count, path, cache_configs):
+        """
+        Simulates the first instruction_count instructions of
+        run_many(trace_files, cache_configs) and saves the complete simulator
+        state to path (see checkpoint.py). Returns the Results up to that point.
+        Those instructions are always simulated in detail: warm-up, sampling
+        and interval statistics apply to the runs resumed from the checkpoint.
+        """
+        for cache_config in cache_configs:
+            cache_config.validate()
+        seed = run_seed(self.config.seed)
+        caches = self._caches(trace_files, cache_configs, seed, None)
+        vm, stream = self._simulate(trace_files, caches, seed, stop=instruction_count)
+
+        meta = {"config": asdict(self.config), "trace_files": list(trace_files), "seed": seed,
+                "instruction_count": stream.instruction_count,
+                "models": [[getattr(cache_config, name) for name in MODEL_FIELDS] for cache_config in cache_configs]}
+        state = {"caches": [cache.get_state() for cache in caches], "vm": vm.get_state(), "stream": asdict(stream)}
+        write_checkpoint(path, meta, state)
+        return self._results(trace_files, cache_configs, caches, vm, stream)
+
+    def resume(self, path, trace_files=None):
+        """
+        resume_many() of a checkpoint of this Simulator's own cache model.
+        """
+        return self.resume_many(path, trace_files, [self.config])[0]
+
+    def resume_many(self, path, trace_files=None, cache_configs=None):
+        """
+        Continues a run saved by checkpoint_many() to the end of its traces and
+        returns one Results per cache model, the same as an uninterrupted
+        run_many(). The trace files default to the ones the checkpoint names,
+        the cache models to the saved ones. Only the STATE_FIELDS and the
+        MODEL_FIELDS of the models have to match the checkpoint: the resumed
+        part can be warmed up, sampled or recorded in intervals, counting
+        phases and intervals from the checkpoint on. A checkpoint can be
+        resumed any number of times.
+        """
+        meta, state = read_checkpoint(path)
+        saved = SimConfig(**meta["config"])
+        for name in STATE_FIELDS:
+            if _state_value(self.config, name) != _state_value(saved, name):
+                raise ValueError(f'{path} was saved with {name} = {getattr(saved, name)!r}.')
+        # Checkpoints of single model runs before "models" was saved
+        models = meta.get("models") or [[getattr(saved, name) for name in MODEL_FIELDS]]
+        if cache_configs is None:
+            cache_configs = [self.config.with_cache(*model) for model in models]
+        for cache_config in cache_configs:
+            cache_config.validate()
+        if ([[_state_value(cache_config, name) for name in MODEL_FIELDS] for cache_config in cache_configs]
+                != [[_state_value(saved.with_cache(*model), name) for name in MODEL_FIELDS] for model in models]):
+            raise ValueError(f'{path} was saved with the cache models {" ".join(",".join(map(str, model)) for model in models)}.')
+        trace_files = list(trace_files or meta["trace_files"])
+        if len(trace_files) != len(meta["trace_files"]):
+            raise ValueError(f'{path} was saved with {len(meta["trace_files"])} trace file(s).')
+
+        seed = meta["seed"]
+        start = meta["instruction_count"]
+        caches = self._caches(trace_files, cache_configs, seed, self._schedule(start))
+        for cache, cache_state in zip(caches, state.get("caches") or [state["cache"]]):
+            cache.set_state(cache_state)
+        return self._run(trace_files, cache_configs, caches, seed, start, state["vm"], StreamTotals(**state["stream"]))
+
+    def _run(self, trace_files, cache_configs, caches, seed, start=0, vm_state=None, totals=None):
+        # run_many() / resume_many() once the caches are set up
+        if self._phased():
+            return self._run_phases(trace_files, cache_configs, caches, seed, start, vm_state, totals)
+        if self.intervals is not None:
+            vm, stream = self._simulate_intervals(trace_files, caches, seed, start, vm_state, totals)
+        else:
+            vm, stream = self._simulate(trace_files, caches, seed, start, vm_state=vm_state, totals=totals)
+        return self._results(trace_files, cache_configs, caches, vm, stream)
+
+    def _caches(self, trace_files, cache_configs, seed, phases):
+        # OPT caches need to know the future: one extra pass over the traces,
+        # following the phase schedule of the run (None = not phased)
+        opt_offsets = {cache_config.block_offset for cache_config in cache_configs if _is_optimal(cache_config)}
+        if opt_offsets:
+            _check_rereadable(trace_files)
+        next_uses = self._physical_next_use(trace_files, opt_offsets, seed, phases) if opt_offsets else {}
+
+        return [self._cache(cache_config, next_uses.get(cache_config.block_offset), seed)
+                for cache_config in cache_configs]
+
+    @staticmethod
+    def _results(trace_files, cache_configs, caches, vm, stream):
+        tlb = vm.tlb
+
+        return [
+            Results(
+                config=cache_config,
+                trace_files=list(trace_files),
+                instruction_count=stream.instruction_count,
+                instruction_bytes=stream.instruction_bytes,
+                src_dst_bytes=stream.src_dst_bytes,
+                # Base execution cycles are +2 per instruction, vm.cycles includes TLB misses
+                total_cycles=cache.cycles + vm.cycles + 2 * stream.instruction_count,
+                cache_accesses=cache.accesses,
+                cache_hits=cache.hits,
+                cache_misses=cache.misses,
+                compulsory_misses=cache.compulsory_misses,
+                conflict_misses=cache.conflict_misses,
+                unused_cache_blocks=cache.unused_blocks(),
+                page_table_hits=vm.page_table_hits,
+                pages_from_free=vm.pages_from_free,
+                total_page_faults=vm.page_faults,
+                used_page_table_entries=[vm.used_entries(i) for i in range(len(trace_files))],
+                tlb_hits=tlb.hits if tlb else 0,
+                tlb_misses=tlb.misses if tlb else 0,
+                tlb_flushes=tlb.flushes if tlb else 0,
+                tlb_cycles=tlb.cycles if tlb else 0,
+            )
+            for cache_config, cache in zip(cache_configs, caches)
+        ]
+
+    def run_stack_distance(self, trace_files, geometries, max_associativity=MAX_STACK_DEPTH):
+        """
+        LRU stack-distance analysis: one pass gives the hit rate and CPI of
+        every associativity up to max_associativity for each (block size,
+        set count) in geometries. Returns a list of StackDistanceRow.
+        """
+        if self._phased():
+            raise ValueError('Stack-distance analysis does not support warm-up or sampling.')
+        if self.intervals is not None:
+            raise ValueError('Stack-distance analysis does not support interval statistics.')
+        analyzers = [StackDistance(block_size, sets, max_associativity) for block_size, sets in geometries]
+        vm, stream = self._simulate(trace_files, analyzers, run_seed(self.config.seed))
+
+        # Cycles every cache model pays regardless of hits and misses
+        base_cycles = vm.cycles + 2 * stream.instruction_count
+        rows = []
+        for analyzer in analyzers:
+            rows += analyzer.rows(stream.instruction_count, base_cycles)
+        return rows
+
+    def _simulate(self, trace_files, models, seed, start=0, stop=None, vm_state=None, totals=None):
+        """
+        Runs the trace pipeline once, feeding every physical address to each model
+        (anything with access_batch(phys_addrs, flags) and invalidate_page(ppn)).
+        Only instructions [start, stop) are simulated; a run resumed at 'start'
+        passes the saved VirtualMemory state and totals.
+        Returns the VirtualMemory and the StreamTotals of the run.
+        """
+        validate_trace_files(trace_files)
+        timed, timed_call = self._timers()
+
+        vm = self._virtual_memory(trace_files, timed_call(self._evict_from(models), "invalidate"), seed)
+        if vm_state is not None:
+            vm.set_state(vm_state)
+        totals = totals or StreamTotals()
+        counted = totals.instruction_count
+
+        # read -> decode -> schedule -> expand
+        batches = access_batches(trace_files, self.config.instructions, self.bulk_decode, totals, start, stop)
+
+        # -> translate -> cache
+        accessors = [timed_call(model.access_batch, "cache") for model in models]
+        for phys_addrs, flags in timed(translate(timed(batches, "parse"), vm), "translate"):
+            for access_batch in accessors:
+                access_batch(phys_addrs, flags)
+
+        if self.profile is not None:
+            self.profile.instructions += totals.instruction_count - counted
+        return vm, totals
+
+    def _timers(self):
+        # (timed, timed_call) of the profile, or functions that leave everything as is
+        if self.profile is None:
+            return _untimed, _untimed
+        return self.profile.timed, self.profile.timed_call
+
+    def _phased(self):
+        return bool(self.config.warmup or self.config.sample_window)
+
+    def _schedule(self, start=0):
+        # Phase schedule of a run resumed at 'start' (0 = from the beginning), None if not phased
+        if not self._phased():
+            return None
+        phases = phase_schedule(self.config)
+        return resumed_schedule(phases, start) if start else phases
+
+    def _simulate_intervals(self, trace_files, caches, seed, start=0, vm_state=None, totals=None):
+        """
+        _simulate() split at every self.intervals.every instructions. The
+        counter changes of each scheduled batch go to its process, and every
+        interval ends with its rows added to self.intervals. A run resumed
+        at 'start' counts its intervals from there.
+        """
+        validate_trace_files(trace_files)
+        timed, timed_call = self._timers()
+        vm = self._virtual_memory(trace_files, timed_call(self._evict_from(caches), "invalidate"), seed)
+        if vm_state is not None:
+            vm.set_state(vm_state)
+        totals = totals or StreamTotals()
+        counted = totals.instruction_count
+        accessors = [timed_call(cache.access_batch, "cache") for cache in caches]
+
+        # COUNTERS of the current interval per cache and process
+        counts = [[[0] * len(COUNTERS) for _ in trace_files] for _ in caches]
+
+        def snapshot():
+            return [(totals.instruction_count, cache.accesses, cache.hits, cache.misses, cache.compulsory_misses,
+                     cache.conflict_misses, vm.page_faults, cache.cycles + vm.cycles) for cache in caches]
+
+        interval = None
+        phases = interval_schedule(self.intervals.every)
+        if start:
+            phases = resumed_schedule(phases, start)
+        batches = phase_batches(trace_files, self.config.instructions, phases)
+        for (next_interval, _), process_id, records in timed(batches, "parse"):
+            if next_interval == RESUMED:
+                continue # simulated before the checkpoint
+            if next_interval != interval:
+                if interval is not None:
+                    self.intervals.add_interval(interval, totals.instruction_count, counts)
+                interval = next_interval
+
+            start = snapshot()
+            expanded = timed(expand(((process_id, records),), totals), "parse")
+            for phys_addrs, flags in timed(translate(expanded, vm), "translate"):
+                for access_batch in accessors:
+                    access_batch(phys_addrs, flags)
+
+            for cache_counts, before, after in zip(counts, start, snapshot()):
+                process_counts = cache_counts[process_id]
+                for i, (a, b) in enumerate(zip(before, after)):
+                    process_counts[i] += b - a
+                # Base execution cycles: +2 per instruction
+                process_counts[7] += 2 * (after[0] - before[0])
+        if interval is not None:
+            self.intervals.add_interval(interval, totals.instruction_count, counts)
+
+        if self.profile is not None:
+            self.profile.instructions += totals.instruction_count - counted
+        return vm, totals
+
+    def _run_phases(self, trace_files, cache_configs, caches, seed, start=0, vm_state=None, totals=None):
+        """
+        run_many() split into SKIP / WARM / MEASURE phases (sampling.phase_schedule).
+        Counters are taken at the start and end of every MEASURE window and
+        only the differences end up in the Results. A run resumed at 'start'
+        counts its phases from there.
+        """
+        validate_trace_files(trace_files)
+        timed, timed_call = self._timers()
+        vm = self._virtual_memory(trace_files, timed_call(self._evict_from(caches), "invalidate"), seed)
+        if vm_state is not None:
+            vm.set_state(vm_state)
+        totals = totals or StreamTotals()
+        counted = totals.instruction_count
+        accessors = [timed_call(cache.access_batch, "cache") for cache in caches]
+        fast_forward = timed_call(vm.fast_forward, "translate")
+
+        # Instructions simulated before a checkpoint warmed the models in full detail
+        phase_instructions = {SKIP: 0, WARM: counted, MEASURE: 0}
+        measured = [[0] * 9 for _ in caches]
+        samples = [[] for _ in caches]
+
+        def snapshot():
+            return [(totals.instruction_count, totals.instruction_bytes, totals.src_dst_bytes,
+                     cache.accesses, cache.hits, cache.misses, cache.compulsory_misses,
+                     cache.conflict_misses, cache.cycles + vm.cycles) for cache in caches]
+
+        # SKIP batches only go through the page tables, one address per page run when that is exact
+        merge_pages = vm.page_policy.repeat_safe and vm.page_policy.ways > 0
+
+        if self.bulk_decode:
+            # NumPy chunks: SKIP spans are fast-forwarded without ever
+            # becoming records, only WARM / MEASURE ones are decoded further
+            batches = phase_chunks(trace_files, self.config.instructions, self._schedule(start))
+            expand_skipped = timed_call(expand_chunk_pages, "parse")
+            decode = timed_call(RecordChunk.records, "parse")
+        else:
+            batches = phase_batches(trace_files, self.config.instructions, self._schedule(start))
+            expand_skipped = timed_call(expand_pages, "parse")
+            decode = None
+
+        segment = None
+        before = snapshot()
+        for next_segment, process_id, records in timed(batches, "parse"):
+            if next_segment[0] == RESUMED:
+                continue # simulated before the checkpoint
+            if next_segment != segment:
+                if segment is not None:
+                    self._end_segment(segment[0], before, snapshot(), phase_instructions, measured, samples)
+                segment = next_segment
+                before = snapshot()
+
+            if decode is not None and not (segment[0] == SKIP and merge_pages):
+                records = decode(records)
+            if segment[0] != SKIP:
+                expanded = timed(expand(((process_id, records),), totals), "parse")
+                for phys_addrs, flags in timed(translate(expanded, vm), "translate"):
+                    for access_batch in accessors:
+                        access_batch(phys_addrs, flags)
+            elif merge_pages:
+                addresses, repeats = expand_skipped(records, totals)
+                if not fast_forward(addresses, process_id):
+                    for _ in timed(translate(((process_id, addresses, addresses),), vm), "translate"):
+                        pass
+                vm.count_repeats(repeats)
+            else:
+                expanded = timed(expand(((process_id, records),), totals), "parse")
+                for _ in timed(translate(expanded, vm), "translate"):
+                    pass
+        if segment is not None:
+            self._end_segment(segment[0], before, snapshot(), phase_instructions, measured, samples)
+
+        if self.profile is not None:
+            self.profile.instructions += totals.instruction_count - counted
+        results = self._results(trace_files, cache_configs, caches, vm, totals)
+        return [
+            replace(result,
+                    instruction_count=counts[0],
+                    instruction_bytes=counts[1],
+                    src_dst_bytes=counts[2],
+                    total_cycles=counts[8] + 2 * counts[0],
+                    cache_accesses=counts[3],
+                    cache_hits=counts[4],
+                    cache_misses=counts[5],
+                    compulsory_misses=counts[6],
+                    conflict_misses=counts[7],
+                    warmup_instructions=phase_instructions[WARM],
+                    skipped_instructions=phase_instructions[SKIP],
+                    samples=cache_samples)
+            for result, counts, cache_samples in zip(results, measured, samples)
+        ]
+
+    @staticmethod
+    def _end_segment(phase, start, end, phase_instructions, measured, samples):
+        phase_instructions[phase] += end[0][0] - start[0][0]
+        if phase != MEASURE:
+            return
+        for counts, cache_samples, before, after in zip(measured, samples, start, end):
+            delta = [b - a for a, b in zip(before, after)]
+            for i, value in enumerate(delta):
+                counts[i] += value
+            cache_samples.append(Sample(instructions=delta[0], accesses=delta[3], hits=delta[4],
+                                        cycles=delta[8] + 2 * delta[0]))
+
+    def _cache(self, config, next_use, seed):
+        if self.engine == "numba" and config.replacement_policy.upper() in COMPILED_POLICIES:
+            return CompiledCache(config)
+        return Cache(config, next_use, make_rng(self.config.rng, seed, CACHE_STREAM))
+
+    def _virtual_memory(self, trace_files, on_evict, seed):
+        next_use = None
+        if _is_optimal(self.config):
+            _check_rereadable(trace_files)
+            # Next use of every (process, vpn) access, in the order translate() sees them
+            keys = array('q')
+            for process_id, addresses, _ in access_batches(trace_files, self.config.instructions,
+                                                           self.bulk_decode, StreamTotals()):
+                keys.extend((address >> PAGE_SHIFT) * MAX_TRACE_FILES + process_id for address in addresses)
+            next_use = next_use_index(keys)
+        return VirtualMemory(self.config, len(trace_files), on_evict, next_use,
+                             make_rng(self.config.rng, seed, VM_STREAM), make_rng(self.config.rng, seed, TLB_STREAM))
+
+    def _physical_next_use(self, trace_files, block_offsets, seed, phases):
+        """
+        OPT pre-pass: translates the whole run with a throwaway VirtualMemory
+        and returns {block_offset: next-use index of the physical block stream}.
+        With the run's seed it translates exactly like the real run.
+        phases is the run's phase schedule, None if it is not phased.
+        """
+        vm = self._virtual_memory(trace_files, lambda ppn: None, seed)
+        phys = array('q')
+        if phases is not None:
+            # The cache never sees SKIP accesses (RESUMED ones it saw before the checkpoint)
+            totals = StreamTotals()
+            batches = phase_batches(trace_files, self.config.instructions, phases)
+            for (phase, _), process_id, records in batches:
+                for phys_addrs, _ in translate(expand(((process_id, records),), totals), vm):
+                    if phase != SKIP:
+                        phys.extend(phys_addr for phys_addr in phys_addrs if phys_addr is not None)
+        else:
+            batches = access_batches(trace_files, self.config.instructions, self.bulk_decode, StreamTotals())
+            for phys_addrs, _ in translate(batches, vm):
+                phys.extend(phys_addr for phys_addr in phys_addrs if phys_addr is not None)
+
+        return {offset: next_use_index(array('q', (phys_addr >> offset for phys_addr in phys)))
+                for offset in block_offsets}
+
+    @staticmethod
+    def _evict_from(models):
+        if len(models) == 1:
+            return models[0].invalidate_page
+
+        def invalidate_page(ppn):
+            for model in models:
+                model.invalidate_page(ppn)
+        return invalidate_page
+
+
+def _untimed(value, stage):
+    return value
+
+
+def _state_value(config, name):
+    # Policy and random source names are case insensitive
+    value = getattr(config, name)
+    return value.upper() if isinstance(value, str) else value
+
+
+def _is_optimal(config):
+    return POLICIES[config.replacement_policy.upper()] is Optimal
+
+
+def _check_rereadable(trace_files):
+    # OPT pre-passes read the traces once before the run itself
+    if "-" in trace_files:
+        raise ValueError('OPT replacement reads the traces twice and cannot read a trace from stdin (-).')
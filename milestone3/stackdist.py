@@ -0,0 +1,150 @@
+import math
+from dataclasses import dataclass
+
+# Deepest stack position kept per set = largest associativity reported
+MAX_STACK_DEPTH = 16
+
+
+@dataclass
+class StackDistanceRow:
+    """
+    LRU results for one associativity of a (block size, set count) geometry.
+    """
+    block_size: int
+    sets: int
+    associativity: int
+    accesses: int
+    hits: int
+    compulsory_misses: int
+    total_cycles: int
+    instruction_count: int
+
+    @property
+    def cache_size(self):
+        # KB
+        return self.sets * self.associativity * self.block_size / 1024
+
+    @property
+    def misses(self):
+        return self.accesses - self.hits
+
+    @property
+    def hit_rate(self):
+        if self.accesses > 0:
+            return (self.hits * 100) / self.accesses
+        return 0
+
+    @property
+    def miss_rate(self):
+        if self.accesses > 0:
+            return 100 - self.hit_rate
+        return 0
+
+    @property
+    def cpi(self):
+        if self.instruction_count > 0:
+            return self.total_cycles / self.instruction_count
+        return 0
+
+
+class StackDistance:
+    """
+    Mattson stack-distance model of LRU caches with one block size and set count.
+    Each set keeps its blocks most recent first. The depth a block is found at
+    is its stack distance, and an A-way LRU cache hits exactly the accesses
+    with distance < A, so one pass gives every associativity up to max_associativity.
+    Page-fault invalidations are not modelled, so with page faults the
+    numbers approximate the invalidating simulator.
+    """
+
+    def __init__(self, block_size, sets, max_associativity=MAX_STACK_DEPTH):
+        if sets < 1 or sets & (sets - 1):
+            raise ValueError(f'Set count must be a power of 2 (got {sets}).')
+        self.block_size = block_size
+        self.sets = sets
+        self.depth = max_associativity
+        self.block_offset = int(math.log2(block_size))
+        self.set_mask = sets - 1
+        self.miss_penalty = 4 * math.ceil(block_size / 4)
+
+        self.stacks = [[] for _ in range(sets)]
+        self.histogram = [0] * max_associativity       # hits by stack distance
+        self.data_histogram = [0] * max_associativity  # ... of dstM/srcM accesses only
+        self.distinct = [0] * sets                     # distinct blocks seen per set
+        self.seen = set()
+
+        self.accesses = 0
+        self.data_accesses = 0
+
+    def access(self, phys_addr, is_instruction):
+        self.access_batch((phys_addr,), (is_instruction,))
+
+    def access_batch(self, phys_addrs, flags):
+        stacks = self.stacks
+        histogram = self.histogram
+        data_histogram = self.data_histogram
+        distinct = self.distinct
+        seen = self.seen
+        block_offset = self.block_offset
+        set_mask = self.set_mask
+        depth = self.depth
+
+        for phys_addr, is_instruction in zip(phys_addrs, flags):
+            if phys_addr is None:
+                continue
+            block = phys_addr >> block_offset
+            set_idx = block & set_mask
+            stack = stacks[set_idx]
+
+            self.accesses += 1
+            if not is_instruction:
+                self.data_accesses += 1
+
+            try:
+                distance = stack.index(block)
+            except ValueError:
+                # Deeper than any associativity we report (or never seen): a miss for all
+                if block not in seen:
+                    seen.add(block)
+                    distinct[set_idx] += 1
+                stack.insert(0, block)
+                if len(stack) > depth:
+                    stack.pop()
+                continue
+
+            histogram[distance] += 1
+            if not is_instruction:
+                data_histogram[distance] += 1
+            if distance:
+                del stack[distance]
+                stack.insert(0, block)
+
+    def invalidate_page(self, ppn):
+        pass
+
+    def rows(self, instruction_count, base_cycles):
+        """
+        One StackDistanceRow per power of 2 associativity up to max_associativity.
+        base_cycles are the cycles every model pays (instructions, page faults).
+        """
+        rows = []
+        associativity = 1
+        while associativity <= self.depth:
+            hits = sum(self.histogram[:associativity])
+            data_misses = self.data_accesses - sum(self.data_histogram[:associativity])
+            misses = self.accesses - hits
+
+            rows.append(StackDistanceRow(
+                block_size=self.block_size,
+                sets=self.sets,
+                associativity=associativity,
+                accesses=self.accesses,
+                hits=hits,
+                # A set only misses into an empty way until it has seen 'associativity' blocks
+                compulsory_misses=sum(min(count, associativity) for count in self.distinct),
+                # Hit: 1 cycle, miss: the block fill, data miss: +1 for the address calculation
+                total_cycles=base_cycles + hits + misses * self.miss_penalty + data_misses,
+                instruction_count=instruction_count,
+            ))
+            associativity *= 2
+        return rows
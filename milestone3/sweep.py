@@ -0,0 +1,170 @@
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+
+from simulator import Simulator
+
+CSV_HEADER = ["Trace File", "Cache Size (KB)", "Block Size (B)", "Policy", "Hit Rate (%)", "CPI"]
+CACHE_FILE = ".sweep_cache.jsonl"
+
+
+def trace_digest(path):
+    """
+    SHA-256 of a trace file's contents, so cached results follow the data, not the name.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cell_key(base_config, model, digest):
+    """
+    Identifies one sweep cell: every field of the run's config and of the
+    cache model (fields added to SimConfig later included) plus the trace content.
+    """
+    return json.dumps([digest, asdict(base_config), asdict(model)], sort_keys=True)
+
+
+def is_reproducible(base_config, model):
+    """
+    Whether a cell gives the same result every run: random replacement
+    (cache, page or TLB) only does with a fixed seed.
+    """
+    if base_config.seed is not None:
+        return True
+    policies = [base_config.replacement_policy, model.replacement_policy]
+    if base_config.tlb_entries:
+        policies.append(base_config.tlb_policy)
+    return not any(policy.upper() == "RND" for policy in policies)
+
+
+class ResultCache:
+    """
+    Append-only JSON-lines store of finished sweep cells, keyed by cell_key().
+    Each result is flushed as soon as it is known, so an interrupted sweep
+    picks up where it stopped.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # a line cut short by an interrupted write
+                    self.entries[entry["key"]] = entry["result"]
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, result):
+        self.entries[key] = result
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"key": key, "result": result}) + "\n")
+
+
+def summarize(results):
+    """
+    The structured fields of a Results that a sweep keeps.
+    """
+    return {
+        "hit_rate": results.hit_rate,
+        "miss_rate": results.miss_rate,
+        "cpi": results.cpi,
+        "total_cycles": results.total_cycles,
+        "cache_hits": results.cache_hits,
+        "cache_misses": results.cache_misses,
+        "total_page_faults": results.total_page_faults,
+    }
+
+
+def _run_job(base_config, trace, models):
+    # Worker process: one pass over the trace for a group of cache models
+    return [summarize(results) for results in Simulator(base_config).run_many([trace], models)]
+
+
+def csv_row(trace, config, result):
+    return [trace, config.cache_size, config.block_size, config.replacement_policy,
+            f"{result['hit_rate']:.4f}", f"{result['cpi']:.2f}"]
+
+
+def run_sweep(base_config, trace_files, models, output_csv, cache_path=CACHE_FILE, workers=None, log=print):
+    """
+    Runs every (trace, model) cell on a process pool, one worker per core.
+    Cells already in the result cache are not simulated again; unseeded
+    random replacement cells are never cached. Rows are
+    appended to output_csv as workers finish, and the file is rewritten in
+    matrix order at the end. Returns {(trace, model index): result}.
+    """
+    workers = workers or os.cpu_count() or 1
+    cache = ResultCache(cache_path)
+
+    done = {}
+    pending = {}
+    for trace in trace_files:
+        try:
+            digest = trace_digest(trace)
+        except OSError as e:
+            log(f"Failed on {trace}: {e}")
+            continue
+        for i, model in enumerate(models):
+            key = cell_key(base_config, model, digest) if is_reproducible(base_config, model) else None
+            result = cache.get(key) if key is not None else None
+            if result is None:
+                pending.setdefault(trace, []).append((i, key))
+            else:
+                done[(trace, i)] = result
+
+    log(f"{len(done)} cells cached, {sum(len(cells) for cells in pending.values())} to simulate on {workers} worker(s)")
+
+    with open(output_csv, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+        for (trace, i), result in done.items():
+            writer.writerow(csv_row(trace, models[i], result))
+        csvfile.flush()
+
+        # Split each trace's cells so there is at least one job per worker
+        groups = max(1, -(-workers // max(1, len(pending))))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for trace, cells in pending.items():
+                for g in range(groups):
+                    group = cells[g::groups]
+                    if group:
+                        future = pool.submit(_run_job, base_config, trace, [models[i] for i, _ in group])
+                        futures[future] = (trace, group)
+
+            for future in as_completed(futures):
+                trace, group = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    log(f"Failed on {trace}: {e}")
+                    continue
+                for (i, key), result in zip(group, results):
+                    if key is not None:
+                        cache.put(key, result)
+                    done[(trace, i)] = result
+                    writer.writerow(csv_row(trace, models[i], result))
+                csvfile.flush()
+                log(f"Finished: {trace} | {len(group)} cache models")
+
+    # Final file in matrix order
+    with open(output_csv, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+        for trace in trace_files:
+            for i, model in enumerate(models):
+                if (trace, i) in done:
+                    writer.writerow(csv_row(trace, model, done[(trace, i)]))
+
+    return done
@@ -0,0 +1,109 @@
+import random
+from array import array
+from collections import OrderedDict
+
+from rng import rng_state, set_rng_state
+
+
+class TLB:
+    """
+    Set-associative TLB in front of the page tables.
+    Entries are tagged with the process id (ASID) so they survive context
+    switches, or with flush_on_switch the whole TLB is emptied whenever a
+    different process translates. Replacement is per set: LRU, RR (oldest
+    fill first) or RND (from rng). Each miss costs miss_penalty cycles.
+    """
+
+    def __init__(self, entries, associativity, replacement_policy, flush_on_switch=False, miss_penalty=10, rng=None):
+        self.entries = entries
+        self.associativity = associativity
+        self.replacement_policy = replacement_policy.upper()
+        self.flush_on_switch = flush_on_switch
+        self.miss_penalty = miss_penalty
+        self.rng = rng or random
+
+        self.set_mask = entries // associativity - 1
+        # One OrderedDict per set: key -> ppn, oldest (or least recent) first
+        self.sets = [OrderedDict() for _ in range(entries // associativity)]
+        self.current_process = None
+
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+
+    @property
+    def cycles(self):
+        return self.misses * self.miss_penalty
+
+    def _key(self, process_id, vpn):
+        return vpn if self.flush_on_switch else (process_id, vpn)
+
+    def lookup(self, process_id, vpn):
+        """
+        Returns the cached PPN for (process, vpn), or None on a TLB miss.
+        """
+        if process_id != self.current_process:
+            if self.flush_on_switch and self.current_process is not None:
+                self.flush()
+            self.current_process = process_id
+
+        entries = self.sets[vpn & self.set_mask]
+        key = self._key(process_id, vpn)
+        ppn = entries.get(key)
+        if ppn is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self.replacement_policy == "LRU":
+            entries.move_to_end(key)
+        return ppn
+
+    def insert(self, process_id, vpn, ppn):
+        """
+        Fills the TLB after a miss, replacing an entry of a full set.
+        """
+        entries = self.sets[vpn & self.set_mask]
+        if len(entries) >= self.associativity:
+            if self.replacement_policy == "RND":
+                del entries[list(entries)[self.rng.randint(0, len(entries) - 1)]]
+            else:
+                entries.popitem(last=False)
+        entries[self._key(process_id, vpn)] = ppn
+
+    def invalidate(self, process_id, vpn):
+        """
+        Drops the entry of an unmapped page (TLB shootdown).
+        """
+        if self.flush_on_switch and process_id != self.current_process:
+            return # flushed when that process was switched out
+        self.sets[vpn & self.set_mask].pop(self._key(process_id, vpn), None)
+
+    def flush(self):
+        self.flushes += 1
+        for entries in self.sets:
+            entries.clear()
+
+    def get_state(self):
+        # (set, process, vpn, ppn) per entry, each set in replacement order;
+        # process -1 when entries are not tagged
+        entries = array('q')
+        for set_idx, ways in enumerate(self.sets):
+            for key, ppn in ways.items():
+                process_id, vpn = (-1, key) if self.flush_on_switch else key
+                entries.extend((set_idx, process_id, vpn, ppn))
+        return {"entries": entries, "current_process": self.current_process, "rng": rng_state(self.rng),
+                "hits": self.hits, "misses": self.misses, "flushes": self.flushes}
+
+    def set_state(self, state):
+        for ways in self.sets:
+            ways.clear()
+        entries = state["entries"]
+        for i in range(0, len(entries), 4):
+            set_idx, process_id, vpn, ppn = entries[i:i + 4]
+            self.sets[set_idx][self._key(process_id, vpn)] = ppn
+        self.current_process = state["current_process"]
+        set_rng_state(self.rng, state["rng"])
+        self.hits = state["hits"]
+        self.misses = state["misses"]
+        self.flushes = state["flushes"]
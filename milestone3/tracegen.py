@@ -0,0 +1,219 @@
+import os
+import random
+import sys
+from dataclasses import dataclass, fields
+
+from config import PAGE_SIZE
+from traces import DST, EIP, SRC, write_compiled_trace
+from vm import PAGE_SHIFT, TABLE_ENTRIES
+
+# --- SYNTHETIC TRACE GENERATOR ---
+# main.py generate-trace writes seeded synthetic traces of any length in the
+# text (.trc) or compiled (.trcb) format. Instructions are generated one at
+# a time, so memory stays bounded by the reuse history whatever the length.
+ADDRESS_LIMIT = TABLE_ENTRIES << PAGE_SHIFT # first address past the 32-bit address space
+WORD = 4 # data accesses are 4-byte words
+
+
+@dataclass(frozen=True)
+class TraceShape:
+    """
+    Parameters of a synthetic trace. Rates are per instruction (jump, dstM,
+    srcM) or per data access (reuse, stride, hot).
+    """
+    # Instruction mix: lengths are drawn uniformly from instruction_lengths
+    instruction_lengths: tuple = (1, 2, 2, 3, 3, 3, 4, 5, 6, 7, 10, 15)
+    jump_rate: float = 0.05      # fetch continues at a random code address
+    dst_rate: float = 0.6        # instruction writes memory (dstM)
+    src_rate: float = 0.6        # instruction reads memory (srcM)
+
+    code_pages: int = 64
+    code_base: int = 0x7c800000
+
+    # Pages the data accesses can touch, and the hot working set among them.
+    # With phase_length, the working set moves to other pages every
+    # phase_length instructions (page-fault storms at every move).
+    data_pages: int = 256
+    working_set_pages: int = 32
+    hot_rate: float = 0.8        # fresh address inside the working set
+    phase_length: int = 0        # 0 = the working set never moves
+    data_base: int = 0x00130000
+
+    # Reuse: repeat the address of an access about reuse_mean accesses back
+    # (exponential distances, at most reuse_history back)
+    reuse_rate: float = 0.0
+    reuse_mean: float = 16
+    reuse_history: int = 4096
+
+    # Strides: continue a sequential stream, stride drawn from strides (bytes)
+    # when a stream starts, stream_length accesses per stream
+    stride_rate: float = 0.0
+    strides: tuple = (4, 8, 64)
+    stream_length: int = 64
+
+    def validate(self):
+        """
+        Raises ValueError if the shape cannot be generated.
+        """
+        for name in ("jump_rate", "dst_rate", "src_rate", "hot_rate", "reuse_rate", "stride_rate"):
+            if not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f'{name} must be between 0 and 1.')
+        if not self.instruction_lengths or not all(1 <= length <= 99 for length in self.instruction_lengths):
+            raise ValueError('Instruction lengths must be between 1 and 99 bytes.')
+        if not self.strides or not all(stride > 0 and stride % WORD == 0 for stride in self.strides):
+            raise ValueError(f'Strides must be positive multiples of {WORD} bytes.')
+        if min(self.code_pages, self.data_pages, self.working_set_pages, self.reuse_history, self.stream_length) < 1:
+            raise ValueError('Page counts, reuse history and stream length must be at least 1.')
+        if self.reuse_mean < 1:
+            raise ValueError('Mean reuse distance must be at least 1.')
+        if self.working_set_pages > self.data_pages:
+            raise ValueError('The working set cannot be larger than the data pages.')
+        if self.phase_length < 0:
+            raise ValueError('Phase length cannot be negative.')
+        for base, pages in ((self.code_base, self.code_pages), (self.data_base, self.data_pages)):
+            # Address 0 would read as "no access" in the text format
+            if base <= 0 or base % PAGE_SIZE or base + pages * PAGE_SIZE > ADDRESS_LIMIT:
+                raise ValueError(f'Code and data pages must be page aligned, above 0 and below {ADDRESS_LIMIT:#x}.')
+        return self
+
+    def changes(self):
+        """
+        {field: value} of the fields that differ from the defaults.
+        """
+        default = TraceShape()
+        return {field.name: getattr(self, field.name) for field in fields(self)
+                if getattr(self, field.name) != getattr(default, field.name)}
+
+
+def process_seed(seed, process):
+    """
+    Seed of one process's trace: every process of a run gets its own stream.
+    """
+    return f"{seed}/{process}"
+
+
+def iter_instructions(shape, instructions, seed):
+    """
+    Yields (length, eip, dst, src) per instruction, dst / src = 0 for no
+    access. The same shape, length and seed always give the same trace.
+    """
+    rng = random.Random(seed)
+    random_, randrange, choice, expovariate = rng.random, rng.randrange, rng.choice, rng.expovariate
+
+    lengths = shape.instruction_lengths
+    code_base = shape.code_base
+    code_end = code_base + shape.code_pages * PAGE_SIZE
+    jump_rate, dst_rate, src_rate = shape.jump_rate, shape.dst_rate, shape.src_rate
+
+    data_base = shape.data_base
+    data_words = shape.data_pages * PAGE_SIZE // WORD
+    data_end = data_base + shape.data_pages * PAGE_SIZE
+    hot_words = shape.working_set_pages * PAGE_SIZE // WORD
+    hot_moves = shape.data_pages - shape.working_set_pages + 1
+    hot_rate, phase_length = shape.hot_rate, shape.phase_length
+
+    reuse_rate, reuse_lambda = shape.reuse_rate, 1 / shape.reuse_mean
+    # Ring buffer of the last reuse_history data addresses
+    history_size = shape.reuse_history
+    history = [0] * history_size
+    accesses = 0
+
+    stride_rate, strides, stream_length = shape.stride_rate, shape.strides, shape.stream_length
+    stream_address = stream_stride = stream_left = 0
+
+    hot_base = data_base
+    eip = code_base
+
+    def data_address():
+        nonlocal accesses, stream_address, stream_stride, stream_left
+        if reuse_rate and accesses and random_() < reuse_rate:
+            distance = min(int(expovariate(reuse_lambda)) + 1, accesses, history_size)
+            address = history[(accesses - distance) % history_size]
+        elif stride_rate and random_() < stride_rate:
+            stream_address += stream_stride
+            stream_left -= 1
+            if stream_left <= 0 or stream_address >= data_end:
+                # New stream, starting in the working set like fresh accesses mostly do
+                if random_() < hot_rate:
+                    stream_address = hot_base + randrange(hot_words) * WORD
+                else:
+                    stream_address = data_base + randrange(data_words) * WORD
+                stream_stride, stream_left = choice(strides), stream_length
+            address = stream_address
+        elif random_() < hot_rate:
+            address = hot_base + randrange(hot_words) * WORD
+        else:
+            address = data_base + randrange(data_words) * WORD
+        history[accesses % history_size] = address
+        accesses += 1
+        return address
+
+    for instruction in range(instructions):
+        if phase_length and instruction % phase_length == 0 and instruction:
+            hot_base = data_base + randrange(hot_moves) * PAGE_SIZE
+
+        length = choice(lengths)
+        if random_() < jump_rate or eip + length > code_end:
+            eip = code_base + randrange(code_end - code_base - length + 1)
+        dst = data_address() if random_() < dst_rate else 0
+        src = data_address() if random_() < src_rate else 0
+        yield length, eip, dst, src
+        eip += length
+
+
+def iter_records(shape, instructions, seed):
+    """
+    Yields the (kind, length, address) records of a synthetic trace, as
+    read_trace would decode them.
+    """
+    for length, eip, dst, src in iter_instructions(shape, instructions, seed):
+        yield EIP, length, eip
+        if dst:
+            yield DST, WORD, dst
+        if src:
+            yield SRC, WORD, src
+
+
+def write_trace(path, shape, instructions, seed, compiled=None):
+    """
+    Writes a synthetic trace, compiled if compiled is set (default: if the
+    path ends in .trcb), '-' = text to stdout. Returns the record count.
+    """
+    shape.validate()
+    if compiled is None:
+        compiled = path.endswith(".trcb")
+    if compiled:
+        if path == "-":
+            raise ValueError('Compiled traces need a file: the header is written last.')
+        return write_compiled_trace(path, iter_records(shape, instructions, seed))
+
+    # Text: EIP line, dstM/srcM line and a blank line per instruction, in
+    # the columns parse_text_trace reads
+    out = sys.stdout if path == "-" else open(path, "w")
+    count = 0
+    lines = []
+    try:
+        for length, eip, dst, src in iter_instructions(shape, instructions, seed):
+            dst_column = f"{dst:08x} 00000000" if dst else "00000000 --------"
+            src_column = f"{src:08x} 00000000" if src else "00000000 --------"
+            lines.append(f"EIP ({length:02d}): {eip:08x} 8b4dfc\ndstM: {dst_column}    srcM: {src_column}\n\n")
+            count += 1 + bool(dst) + bool(src)
+            if len(lines) == 4096:
+                out.writelines(lines)
+                lines.clear()
+        out.writelines(lines)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+def process_paths(path, processes):
+    """
+    One output path per process: path itself for one, path with _1, _2, ...
+    before the extension for more.
+    """
+    if processes == 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}_{process}{ext}" for process in range(1, processes + 1)]
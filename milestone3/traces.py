@@ -0,0 +1,209 @@
+import gzip
+import io
+import lzma
+import mmap
+import struct
+import sys
+import zlib
+from contextlib import contextmanager
+from itertools import chain
+
+# Record kinds
+EIP = 0 # instruction fetch, length = instruction bytes
+DST = 1 # dstM data access (4 bytes)
+SRC = 2 # srcM data access (4 bytes)
+
+# --- COMPILED (BINARY) TRACE FORMAT ---
+# Header: magic, version, 3 pad bytes, record count, CRC32 of the records
+# Record: kind byte, length byte, 32-bit virtual address (little endian)
+TRACE_MAGIC = b"TRCB"
+TRACE_VERSION = 1
+HEADER = struct.Struct("<4sBxxxQI")
+RECORD = struct.Struct("<BBI")
+
+# Compressed inputs are recognised by their magic bytes, not the file name
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+
+BLOCK_BYTES = 1 << 20 # 1 MB of trace per block / record batch
+
+
+def parse_text_trace(lines):
+    """
+    Decodes the text trace format into (kind, length, address) records.
+    dstM/srcM accesses marked '-' or with a 00000000 address are skipped.
+    """
+    for line in lines:
+
+        # PROCESS INSTRUCTION FETCH (EIP)
+        if line.startswith("EIP"):
+            # Format: EIP (04): 7c809767
+            yield (EIP, int(line[5:7]), int(line[10:18], 16))
+
+        # PROCESS DATA ACCESS (dstM)
+        elif line.startswith("dstM"):
+
+            # dstM
+            if line[15] != "-":
+                destAddress_str = line[6:14]
+                if destAddress_str != '00000000':
+                    yield (DST, 4, int(destAddress_str, 16))
+
+            # srcM
+            if line[44] != "-":
+                sourceAddress_str = line[33:41]
+                if sourceAddress_str != '00000000':
+                    yield (SRC, 4, int(sourceAddress_str, 16))
+
+
+@contextmanager
+def open_trace(path):
+    """
+    Opens a trace for binary reading. '-' is stdin, gzip and xz input is
+    decompressed on the fly.
+    """
+    raw = sys.stdin.buffer if path == "-" else open(path, "rb")
+    stream = raw
+    try:
+        head = raw.peek(len(XZ_MAGIC))
+        if head.startswith(GZIP_MAGIC):
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        elif head.startswith(XZ_MAGIC):
+            stream = lzma.LZMAFile(raw)
+        yield stream
+    finally:
+        if stream is not raw:
+            stream.close()
+        if path != "-":
+            raw.close()
+
+
+def iter_blocks(path, block_bytes=BLOCK_BYTES):
+    """
+    Read stage: yields (compiled, block) pairs. Text blocks hold whole lines,
+    compiled blocks whole records. A block may be a view into an mmap and is
+    only valid until the next one is requested.
+    """
+    with open_trace(path) as stream:
+        if stream.peek(len(TRACE_MAGIC))[:len(TRACE_MAGIC)] != TRACE_MAGIC:
+            yield from _text_blocks(stream, block_bytes)
+        elif isinstance(stream, io.BufferedReader) and path != "-":
+            yield from _mapped_blocks(path, stream, block_bytes)
+        else:
+            yield from _compiled_blocks(path, stream, block_bytes)
+
+
+def _text_blocks(stream, block_bytes):
+    leftover = b""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            break
+        data = leftover + data
+        # Only whole lines go out, the rest waits for the next read
+        end = data.rfind(b"\n") + 1
+        leftover = data[end:]
+        if end:
+            yield False, data[:end]
+    if leftover:
+        yield False, leftover + b"\n"
+
+
+def _check_header(path, header):
+    if len(header) < HEADER.size:
+        raise ValueError(f'{path} is truncated or corrupt (checksum mismatch).')
+    magic, version, count, checksum = HEADER.unpack(header)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f'{path} is not a version {TRACE_VERSION} compiled trace.')
+    return count, checksum
+
+
+def _mapped_blocks(path, f, block_bytes):
+    # Plain compiled file: records come straight out of an mmap, no copies
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        count, checksum = _check_header(path, mm[:HEADER.size])
+        records = memoryview(mm)[HEADER.size:]
+        try:
+            if len(records) != count * RECORD.size or zlib.crc32(records) != checksum:
+                raise ValueError(f'{path} is truncated or corrupt (checksum mismatch).')
+
+            step = max(1, block_bytes // RECORD.size) * RECORD.size
+            for start in range(0, len(records), step):
+                block = records[start:start + step]
+                try:
+                    yield True, block
+                finally:
+                    # The mmap can only close once no views are left
+                    block.release()
+        finally:
+            records.release()
+
+
+def _compiled_blocks(path, stream, block_bytes):
+    # Compressed or piped compiled trace: the checksum is checked at the end
+    count, checksum = _check_header(path, stream.read(HEADER.size))
+    remaining = count * RECORD.size
+    step = max(1, block_bytes // RECORD.size) * RECORD.size
+    crc = 0
+    while remaining:
+        data = stream.read(min(step, remaining))
+        if not data or len(data) % RECORD.size:
+            raise ValueError(f'{path} is truncated or corrupt (checksum mismatch).')
+        remaining -= len(data)
+        crc = zlib.crc32(data, crc)
+        if not remaining and crc != checksum:
+            raise ValueError(f'{path} is truncated or corrupt (checksum mismatch).')
+        yield True, data
+
+
+def iter_record_batches(path, block_bytes=BLOCK_BYTES):
+    """
+    Decode stage: yields lists of (kind, length, address) records, one list per block.
+    """
+    for compiled, block in iter_blocks(path, block_bytes):
+        if compiled:
+            yield list(RECORD.iter_unpack(block))
+        else:
+            yield list(parse_text_trace(str(block, "latin-1").split("\n")))
+
+
+def read_trace(path):
+    """
+    Yields the (kind, length, address) records of a text or compiled trace.
+    """
+    for records in iter_record_batches(path):
+        yield from records
+
+
+def write_compiled_trace(path, records):
+    """
+    Writes (kind, length, address) records in the binary format and returns
+    the record count. Records are streamed out in blocks behind a
+    placeholder header, the real count and checksum are filled in at the
+    end, so memory does not grow with the trace.
+    """
+    pack = RECORD.pack
+    count = crc = 0
+    payload = bytearray()
+    with open(path, "wb") as out:
+        out.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, 0, 0))
+        for record in records:
+            payload += pack(*record)
+            if len(payload) >= BLOCK_BYTES:
+                crc = zlib.crc32(payload, crc)
+                count += len(payload) // RECORD.size
+                out.write(payload)
+                payload.clear()
+        crc = zlib.crc32(payload, crc)
+        count += len(payload) // RECORD.size
+        out.write(payload)
+        out.seek(0)
+        out.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, count, crc))
+    return count
+
+
+def compile_trace(src_path, dst_path):
+    """
+    Converts a trace into the binary format. Returns the record count.
+    """
+    return write_compiled_trace(dst_path, chain.from_iterable(iter_record_batches(src_path)))
@@ -0,0 +1,400 @@
+from array import array
+
+from config import PAGE_SIZE
+from frames import FrameAllocator
+from policies import make_policy
+from tlb import TLB
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, only the vectorized translation needs it
+    np = None
+
+PAGE_SHIFT = PAGE_SIZE.bit_length() - 1
+
+# Page table entry of a vpn that has no page
+UNMAPPED = -1
+
+# The flat page tables cover the whole 32-bit address space of a trace
+# (PTE_ENTRIES_PER_PROCESS is the table size the report charges for)
+TABLE_ENTRIES = 1 << (32 - PAGE_SHIFT)
+
+# Batches of at least VECTOR_MIN addresses are translated with NumPy,
+# VECTOR_BATCH addresses at a time
+VECTOR_MIN = 64
+VECTOR_BATCH = 4096
+
+
+class VirtualMemory:
+    """
+    Per-process page tables sharing one pool of user physical pages.
+    on_evict(ppn) is called whenever a page fault takes a physical page
+    away from its owner, so the cache can drop the blocks it holds.
+    With config.tlb_entries > 0 a TLB is consulted before the page tables.
+    The victim of a page fault is chosen by config.replacement_policy over
+    all user pages (one fully associative set); OPT needs the next_use
+    index of the run's (process, vpn) stream. RND page and TLB replacement
+    draw from rng and tlb_rng.
+    """
+
+    def __init__(self, config, num_processes, on_evict, next_use=None, rng=None, tlb_rng=None):
+        self.on_evict = on_evict
+
+        # Shared pool of physical page numbers
+        # PPNs available range from 'system_pages' up to 'pages - 1'
+        self.free_pages = FrameAllocator(config.system_pages, config.pages)
+
+        # Individual page tables for each process: page_tables[pid][vpn] = ppn
+        # or UNMAPPED, TABLE_ENTRIES entries each (4 MB)
+        self.page_tables = [array('i', [UNMAPPED]) * TABLE_ENTRIES for _ in range(num_processes)]
+        self.used = [0] * num_processes
+        # NumPy views of the same tables for vectorized lookups
+        self.table_views = [np.frombuffer(table, dtype=np.int32) for table in self.page_tables] if np is not None else None
+
+        # Page Replacement: user page ppn is way (ppn - first_frame). Frames
+        # are never given back, so faults only happen once every way is mapped.
+        self.first_frame = config.system_pages
+        self.page_policy = make_policy(config.replacement_policy, 1, config.pages_available, next_use, rng)
+
+        # Inverted page table: frame_table[ppn] = (owner process, vpn)
+        self.frame_table = [None] * config.pages
+
+        self.tlb = None
+        if config.tlb_entries:
+            self.tlb = TLB(config.tlb_entries, config.tlb_associativity, config.tlb_policy,
+                           config.tlb_flush, config.tlb_miss_penalty, tlb_rng)
+
+        # Last page translated by each process: vpn and (ppn - vpn) * PAGE_SIZE.
+        # Instruction streams stay on one page for long runs, so most
+        # addresses translate by one compare and one add.
+        self.last_vpn = [-1] * num_processes
+        self.last_delta = [0] * num_processes
+
+        self.page_table_hits = 0
+        self.pages_from_free = 0
+        self.page_faults = 0
+        self.fault_cycles = 0
+
+    @property
+    def cycles(self):
+        # Page fault penalties plus TLB miss penalties
+        return self.fault_cycles + (self.tlb.cycles if self.tlb else 0)
+
+    def translate(self, address_int, process_id):
+        """
+        Resolves VA to PA. Handles Page Faults and Cache Invalidation.
+        Returns the Physical Address (PA), or None if no user page can be mapped.
+        """
+        virtualPageTable = self.page_tables[process_id]
+
+        vpn = address_int // PAGE_SIZE
+        page_offset = address_int % PAGE_SIZE
+        if vpn >= TABLE_ENTRIES:
+            raise ValueError(f'Address {address_int:#x} is not a 32-bit address.')
+
+        # 0. TLB Hit - the page table is not touched at all
+        tlb = self.tlb
+        if tlb is not None:
+            ppn = tlb.lookup(process_id, vpn)
+            if ppn is not None:
+                self.page_table_hits += 1
+                if self.page_policy.tracks_hits:
+                    self.page_policy.touch(0, ppn - self.first_frame)
+                return (ppn * PAGE_SIZE) + page_offset
+
+        # 1. Page Table Hit
+        ppn = virtualPageTable[vpn]
+        if ppn != UNMAPPED:
+            self.page_table_hits += 1
+            if self.page_policy.tracks_hits:
+                self.page_policy.touch(0, ppn - self.first_frame)
+            if tlb is not None:
+                tlb.insert(process_id, vpn, ppn)
+            return (ppn * PAGE_SIZE) + page_offset
+
+        # 2. Page Table Miss - Check Free Pool
+        ppn = self.free_pages.allocate()
+        if ppn is not None:
+            virtualPageTable[vpn] = ppn
+            self.used[process_id] += 1
+            self.frame_table[ppn] = (process_id, vpn)
+            self.pages_from_free += 1
+            self.page_policy.fill(0, ppn - self.first_frame)
+            if tlb is not None:
+                tlb.insert(process_id, vpn, ppn)
+            return (ppn * PAGE_SIZE) + page_offset
+
+        # 3. Page Fault (Swap Required)
+        self.page_faults += 1
+        self.fault_cycles += 100 # Penalty for Page Fault
+
+        if not self.page_policy.ways:
+            return None
+
+        # Select Victim Page (-r policy over all user pages)
+        replacedPPN = self.first_frame + self.page_policy.victim(0)
+
+        # Unmap this PPN from whoever owns it
+        owner, owner_vpn = self.frame_table[replacedPPN]
+        self.page_tables[owner][owner_vpn] = UNMAPPED
+        self.used[owner] -= 1
+        if self.last_vpn[owner] == owner_vpn:
+            self.last_vpn[owner] = -1
+        if tlb is not None:
+            tlb.invalidate(owner, owner_vpn)
+
+        # Map to new VPN
+        virtualPageTable[vpn] = replacedPPN
+        self.used[process_id] += 1
+        self.frame_table[replacedPPN] = (process_id, vpn)
+        self.page_policy.fill(0, replacedPPN - self.first_frame)
+        if tlb is not None:
+            tlb.insert(process_id, vpn, replacedPPN)
+
+        # Drop any cache block that belongs to the replaced page
+        self.on_evict(replacedPPN)
+
+        return (replacedPPN * PAGE_SIZE) + page_offset
+
+    def count_repeats(self, repeats):
+        """
+        Fast-forward: counts 'repeats' back-to-back accesses to the page
+        translated last as the page table (and TLB) hits they would have been.
+        Exact only while repeats change nothing (page_policy.repeat_safe)
+        and there are user pages to map.
+        """
+        self.page_table_hits += repeats
+        if self.tlb is not None:
+            self.tlb.hits += repeats
+
+    def translate_batch(self, addresses, process_id, start=0):
+        """
+        Translates addresses[start:] up to (not including) the first one that
+        needs a page fault with eviction. Returns (phys_addrs, stop index);
+        the caller resolves addresses[stop] with translate().
+        """
+        virtualPageTable = self.page_tables[process_id]
+        phys_addrs = []
+        append = phys_addrs.append
+
+        # Page hits the replacement policy has to hear about; repeated hits
+        # on the page just translated only if they change its state
+        policy = self.page_policy
+        first_frame = self.first_frame
+        touch = policy.touch if policy.tracks_hits else None
+        touch_repeats = None if policy.repeat_safe else touch
+
+        tlb = self.tlb
+        if tlb is not None:
+            # Every access goes through the TLB. Back-to-back accesses to the
+            # page just translated hit its (already most recent) entry, so
+            # they skip the lookup.
+            last_vpn = -1
+            page_base = 0
+            repeats = 0
+            stop = len(addresses)
+            for i in range(start, stop):
+                address_int = addresses[i]
+                vpn = address_int // PAGE_SIZE
+                if vpn == last_vpn:
+                    repeats += 1
+                    append(page_base + address_int % PAGE_SIZE)
+                    if touch_repeats is not None:
+                        touch_repeats(0, page_base // PAGE_SIZE - first_frame)
+                    continue
+                if vpn < TABLE_ENTRIES and virtualPageTable[vpn] == UNMAPPED and not len(self.free_pages):
+                    stop = i
+                    break
+                phys_addr = self.translate(address_int, process_id)
+                append(phys_addr)
+                last_vpn = vpn
+                page_base = phys_addr - address_int % PAGE_SIZE
+            tlb.hits += repeats
+            self.page_table_hits += repeats
+            return phys_addrs, stop
+
+        if self.table_views is not None and touch is None and len(self.free_pages) and len(addresses) - start >= VECTOR_MIN:
+            return self._translate_vector(addresses, process_id, start)
+
+        last_vpn = self.last_vpn[process_id]
+        delta = self.last_delta[process_id]
+        if touch is not None:
+            # Other processes may have touched pages since: the memo page
+            # is not the most recent one any more
+            last_vpn = -1
+        hits = 0
+        stop = len(addresses)
+        for i in range(start, stop):
+            address_int = addresses[i]
+            vpn = address_int >> PAGE_SHIFT
+            if vpn != last_vpn:
+                ppn = virtualPageTable[vpn] if vpn < TABLE_ENTRIES else UNMAPPED
+                if ppn == UNMAPPED:
+                    if not len(self.free_pages):
+                        stop = i
+                        break
+                    # Mapping a free page does not touch the cache
+                    phys_addr = self.translate(address_int, process_id)
+                    append(phys_addr)
+                    last_vpn = vpn
+                    delta = phys_addr - address_int
+                    continue
+                last_vpn = vpn
+                delta = (ppn - vpn) << PAGE_SHIFT
+                if touch is not None:
+                    touch(0, ppn - first_frame)
+            elif touch_repeats is not None:
+                touch_repeats(0, ((address_int + delta) >> PAGE_SHIFT) - first_frame)
+            hits += 1
+            append(address_int + delta)
+
+        self.last_vpn[process_id] = last_vpn
+        self.last_delta[process_id] = delta
+        self.page_table_hits += hits
+        return phys_addrs, stop
+
+    def _translate_vector(self, addresses, process_id, start):
+        """
+        translate_batch() for page policies that ignore hits, with the page
+        table lookups of VECTOR_BATCH addresses done by one fancy index.
+        Mapping a free page never unmaps another, so only the addresses that
+        were unmapped at lookup time are looked at again, one by one.
+        Only used while there are free pages: once the pool is empty every
+        new page ends the batch, and short batches are cheaper one by one.
+        """
+        virtualPageTable = self.page_tables[process_id]
+        table_view = self.table_views[process_id]
+        phys_addrs = []
+        append = phys_addrs.append
+        extend = phys_addrs.extend
+        hits = 0
+        stop = len(addresses)
+
+        for window in range(start, stop, VECTOR_BATCH):
+            vaddrs = np.array(addresses[window:window + VECTOR_BATCH], dtype=np.int64)
+            vpns = vaddrs >> PAGE_SHIFT
+            ppns = np.where(vpns < TABLE_ENTRIES, table_view.take(vpns, mode='clip'), UNMAPPED)
+            phys = ((ppns.astype(np.int64) << PAGE_SHIFT) | (vaddrs & (PAGE_SIZE - 1))).tolist()
+
+            done = 0
+            for j in np.flatnonzero(ppns == UNMAPPED).tolist():
+                extend(phys[done:j])
+                hits += j - done
+                done = j + 1
+
+                address_int = addresses[window + j]
+                vpn = address_int >> PAGE_SHIFT
+                ppn = virtualPageTable[vpn] if vpn < TABLE_ENTRIES else UNMAPPED
+                if ppn != UNMAPPED:
+                    # Mapped earlier in this window
+                    hits += 1
+                    append((ppn << PAGE_SHIFT) | (address_int & (PAGE_SIZE - 1)))
+                elif len(self.free_pages):
+                    append(self.translate(address_int, process_id))
+                else:
+                    self.page_table_hits += hits
+                    self.last_vpn[process_id] = -1
+                    return phys_addrs, window + j
+            extend(phys[done:])
+            hits += len(phys) - done
+
+        self.page_table_hits += hits
+        self.last_vpn[process_id] = -1
+        return phys_addrs, stop
+
+    def fast_forward(self, addresses, process_id):
+        """
+        Translates addresses for their effect on the page tables only, as a
+        fast-forward: the lookups of a run of page table hits are one fancy
+        index, and the page policy hears only the last hit on each page of
+        the run, in order. Free pages and page faults go through translate(),
+        stretches with a miss every few pages through translate_batch().
+        Returns False without doing anything where that would not be exact
+        (TLB, page policies that count hits) or NumPy is missing.
+        """
+        policy = self.page_policy
+        if self.tlb is not None or self.table_views is None or (policy.tracks_hits and not policy.recency_only):
+            return False
+        touch = policy.touch if policy.tracks_hits else None
+        table_view = self.table_views[process_id]
+        vpns = np.asarray(addresses, dtype=np.int64) >> PAGE_SHIFT
+
+        hits = 0
+        start = 0
+        # Shorter windows while pages keep missing: every miss ends a window
+        window = VECTOR_BATCH
+        while start < len(vpns):
+            if window <= VECTOR_MIN:
+                # Misses every few pages (fault storm): one by one is cheaper
+                stretch = addresses[start:start + VECTOR_BATCH]
+                i = 0
+                while i < len(stretch):
+                    _, i = self.translate_batch(stretch, process_id, i)
+                    if i < len(stretch):
+                        self.translate(stretch[i], process_id)
+                        i += 1
+                start += len(stretch)
+                window = VECTOR_BATCH
+                continue
+
+            window_vpns = vpns[start:start + window]
+            ppns = np.where(window_vpns < TABLE_ENTRIES, table_view.take(window_vpns, mode='clip'), UNMAPPED)
+            misses = np.flatnonzero(ppns == UNMAPPED)
+            end = int(misses[0]) if len(misses) else len(ppns)
+
+            if end and touch is not None:
+                frames = ppns[:end] - self.first_frame
+                last_touches = end - 1 - np.unique(frames[::-1], return_index=True)[1]
+                for way in frames[np.sort(last_touches)].tolist():
+                    touch(0, way)
+            hits += end
+            start += end
+            if end < len(ppns):
+                # Mapping a page may unmap any other: look the rest up again
+                self.translate(addresses[start], process_id)
+                start += 1
+                window = max(VECTOR_MIN, 2 * end)
+            else:
+                window = min(VECTOR_BATCH, 2 * window)
+
+        self.page_table_hits += hits
+        self.last_vpn[process_id] = -1
+        return True
+
+    def get_state(self):
+        """
+        Page tables, free pool, replacement / TLB state and counters for a checkpoint.
+        """
+        return {
+            "page_tables": self.page_tables,
+            "next_frame": self.free_pages.next_frame,
+            "released": list(self.free_pages.released),
+            "policy": self.page_policy.get_state(),
+            "tlb": self.tlb.get_state() if self.tlb else None,
+            "counters": [self.page_table_hits, self.pages_from_free, self.page_faults, self.fault_cycles],
+        }
+
+    def set_state(self, state):
+        self.frame_table = [None] * len(self.frame_table)
+        for process_id, table in enumerate(state["page_tables"]):
+            # Checkpoints of smaller tables leave the rest unmapped
+            self.page_tables[process_id][:len(table)] = table
+            self.used[process_id] = 0
+            for vpn, ppn in enumerate(table):
+                if ppn != UNMAPPED:
+                    self.frame_table[ppn] = (process_id, vpn)
+                    self.used[process_id] += 1
+        self.free_pages.next_frame = state["next_frame"]
+        self.free_pages.released.clear()
+        self.free_pages.released.extend(state["released"])
+        self.page_policy.set_state(state["policy"])
+        if self.tlb:
+            self.tlb.set_state(state["tlb"])
+        self.page_table_hits, self.pages_from_free, self.page_faults, self.fault_cycles = state["counters"]
+        self.last_vpn = [-1] * len(self.page_tables)
+
+    def used_entries(self, process_id):
+        """
+        Number of valid entries in a process page table.
+        """
+        return self.used[process_id]